@@ -1,9 +1,19 @@
+# -*- coding: utf-8 -*-
 """This module contains only scientific functions and it is named after the ancient city of
 `Athens <https://en.wikipedia.org/wiki/History_of_Athens#Origins_and_early_history>`_
 `and Athena the godness of science <https://en.wikipedia.org/wiki/Athena>`_
 """
 
 import math
+import re
+import zlib
+from array import array
+from collections import deque, Counter
+from itertools import islice, repeat
+from operator import add, mul, itemgetter
+from Hellas._compat import np, _timer   # np is None without numpy, batch functions fall back to pure python array('d')
+
+EARTH_RADIUS = 6357000          # same default as :func:`haversine` (meters)
 
 
 def ngrams(slice_able, n):
@@ -34,6 +44,349 @@ def bigrams(slice_able):
     return zip(slice_able, slice_able[1:])
 
 
+def iter_stream(iterable_or_file, chunk_size=1024 * 1024):
+    """iterates items of an iterable or characters (bytes) of a file like object read in chunk_size blocks
+    so that a file is never loaded in memory as a whole
+    """
+    if not hasattr(iterable_or_file, 'read'):
+        for i in iterable_or_file:
+            yield i
+        return
+    read = iterable_or_file.read
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        for i in chunk:
+            yield i
+
+
+def ngrams_stream(iterable_or_file, n, chunk_size=1024 * 1024):
+    """same as :func:`ngrams` but works on any iterable or file like object using a rolling window
+    instead of slices so memory usage is independent of input size
+
+    :param iterable_or_file: any iterable or a file like object that supports read
+    :param int n: n-th grams
+    :returns: an iterator of ngram tuples
+
+    :Example:
+        >>> list(ngrams_stream(iter("The quick"), 3))[:3]
+        [('T', 'h', 'e'), ('h', 'e', ' '), ('e', ' ', 'q')]
+    """
+    it = iter_stream(iterable_or_file, chunk_size)
+    window = deque(islice(it, n - 1), maxlen=n)
+    append = window.append
+    for i in it:
+        append(i)
+        yield tuple(window)
+
+
+class CountMinSketch(object):
+    """a count-min sketch for approximate frequency counts in bounded memory
+    estimates never under count and over count by at most 2/width * total with probability 1 - 1/2**depth
+
+    :param int width: counters per row
+    :param int depth: number of rows (hash functions)
+    """
+    def __init__(self, width=2 ** 20, depth=4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [array('L', [0]) * width for i in range(depth)]
+
+    def __repr__(self):
+        return "<CountMinSketch: width={:,d} depth={:d} total={:,d}>".format(self.width, self.depth, self.total)
+
+    def _indexes(self, item):
+        # double hashing (Kirsch-Mitzenmacher) derives depth hash functions from 2 hashes
+        h1 = hash(item)
+        h2 = hash((item, 0x5bd1e995)) | 1
+        width = self.width
+        return [(h1 + i * h2) % width for i in range(self.depth)]
+
+    def add(self, item, count=1):
+        """adds count to item and returns its new estimate"""
+        self.total += count
+        h1, h2, width = hash(item), hash((item, 0x5bd1e995)) | 1, self.width
+        rt = None
+        for row in self._rows:
+            idx = h1 % width
+            vl = row[idx] + count
+            row[idx] = vl
+            if rt is None or vl < rt:
+                rt = vl
+            h1 += h2
+        return rt
+
+    def estimate(self, item):
+        return min(row[idx] for row, idx in zip(self._rows, self._indexes(item)))
+
+    __getitem__ = estimate
+
+
+class NgramCounter(object):
+    """streaming n-gram frequency counter
+
+    - exact mode keeps a counter of all distinct n-grams
+    - approximate mode keeps a :class:`CountMinSketch` plus the top_k heavy hitters so memory is bounded
+      by width * depth counters + 2 * top_k candidates regardless of input size
+
+    :param int n: n-th grams
+    :param bool approximate: use bounded memory approximate mode
+    :param int top_k: number of heavy hitters to track in approximate mode
+    :param int width: see :class:`CountMinSketch`
+    :param int depth: see :class:`CountMinSketch`
+
+    :Example:
+        >>> cnt = NgramCounter(2)
+        >>> cnt.update("The quick brown fox jumps over the lazy dog")
+        >>> cnt.most_common(2)
+        [(('h', 'e'), 2), (('e', ' '), 2)]
+        >>> cnt.stats()
+        {'ngrams': 42, 'seconds': 6.4e-05, 'ngrams_per_sec': 656250.0}
+    """
+    def __init__(self, n, approximate=False, top_k=100, width=2 ** 20, depth=4):
+        self.n = n
+        self.approximate = approximate
+        self.top_k = top_k
+        self.ngrams_count = 0
+        self.seconds = 0.0
+        if approximate:
+            self._sketch = CountMinSketch(width, depth)
+            self._heavy = {}                # candidate heavy hitters -> estimate
+            self._threshold = 0
+        else:
+            self._counter = Counter()
+
+    def __repr__(self):
+        return "<NgramCounter: n={:d} approximate={} ngrams={:,d}>".format(self.n, self.approximate, self.ngrams_count)
+
+    def update(self, iterable_or_file, chunk_size=1024 * 1024):
+        """counts n-grams from any iterable or file like object (see :func:`ngrams_stream`)"""
+        started = _timer()
+        cnt = 0
+        grams = ngrams_stream(iterable_or_file, self.n, chunk_size)
+        if not self.approximate:
+            counter = self._counter
+            for gram in grams:
+                counter[gram] += 1
+                cnt += 1
+        else:
+            add, heavy, limit = self._sketch.add, self._heavy, 2 * self.top_k
+            for gram in grams:
+                estimate = add(gram)
+                cnt += 1
+                if gram in heavy or estimate > self._threshold:
+                    heavy[gram] = estimate
+                    if len(heavy) > limit:
+                        heavy = self._prune()
+        self.ngrams_count += cnt
+        self.seconds += _timer() - started
+
+    def _prune(self):
+        """keeps top_k candidates, a new n-gram needs to exceed the smallest survivor to get in"""
+        kept = sorted(self._heavy.items(), key=lambda x: x[1], reverse=True)[:self.top_k]
+        self._heavy = dict(kept)
+        self._threshold = kept[-1][1] if kept else 0
+        return self._heavy
+
+    def __getitem__(self, ngram):
+        """count of ngram (an upper bound estimate in approximate mode)"""
+        return self._sketch.estimate(ngram) if self.approximate else self._counter[ngram]
+
+    def most_common(self, k=None):
+        """:returns: a list of (ngram, count) tuples for the k most frequent n-grams"""
+        if not self.approximate:
+            return self._counter.most_common(k)
+        k = self.top_k if k is None else min(k, self.top_k)
+        return sorted(self._heavy.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    def stats(self):
+        """:returns: a dictionary with processed n-grams, seconds spent counting and n-grams per second throughput"""
+        return {'ngrams': self.ngrams_count, 'seconds': self.seconds,
+                'ngrams_per_sec': self.ngrams_count / self.seconds if self.seconds > 0 else 0.0}
+
+
+_MERSENNE_61 = (1 << 61) - 1
+_MAX_HASH_32 = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+
+
+def shingle_hashes(doc, n=5):
+    """stable 32 bit hashes (crc32) of the distinct n-gram shingles of doc (see :func:`ngrams`),
+    a non empty doc shorter than n is a single shingle of the whole doc so it doesn't end up with an
+    empty set (and an empty signature equal to that of any other short doc)
+
+    :param doc: a string or any sliceable sequence of tokens (i.e. a list of words)
+    :returns: a set of ints (empty only for an empty doc)
+    """
+    crc32 = zlib.crc32
+    grams = ngrams(doc, n) if len(doc) >= n else [tuple(doc)] if doc else []
+    return set(crc32('\x1f'.join([str(i) for i in gram]).encode('utf8')) & _MAX_HASH_32 for gram in grams)
+
+
+class MinHasher(object):
+    """MinHash signatures over n-gram shingles, the fraction of equal signature values of two documents
+    estimates their Jaccard similarity. Permutations are universal hashes (a * x + b) mod (2**61 - 1)
+    and are computed for all shingles at once with numpy when available
+
+    :param int num_perm: signature length
+    :param int n: shingle size for :func:`shingle_hashes`
+    :param int seed: random seed, signatures are comparable only if produced with same num_perm and seed
+
+    :Example:
+        >>> mh = MinHasher(128)
+        >>> mh.jaccard(mh.signature("the quick brown fox jumps"), mh.signature("the quick brown fox jumped"))
+        0.8671875
+    """
+    def __init__(self, num_perm=128, n=5, seed=1, chunk_size=4096):
+        from random import Random
+        rnd = Random(seed)
+        self.num_perm = num_perm
+        self.n = n
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self._a = [rnd.randint(1, _MERSENNE_61 - 1) for i in range(num_perm)]
+        self._b = [rnd.randint(0, _MERSENNE_61 - 1) for i in range(num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)[:, None]
+            self._b_np = np.array(self._b, dtype=np.uint64)[:, None]
+
+    def __repr__(self):
+        return "<MinHasher: num_perm={:d} n={:d} seed={}>".format(self.num_perm, self.n, self.seed)
+
+    def signature_from_hashes(self, hashes):
+        """:returns: a tuple of num_perm ints from an iterable of 32 bit shingle hashes"""
+        hashes = list(hashes)
+        if not hashes:
+            return (_MAX_HASH_32,) * self.num_perm
+        if np is not None:
+            rt = np.full(self.num_perm, _MAX_HASH_32, dtype=np.uint64)
+            for i in range(0, len(hashes), self.chunk_size):   # bounds the (num_perm, chunk) temporary
+                hv = np.array(hashes[i:i + self.chunk_size], dtype=np.uint64)[None, :]
+                with np.errstate(over='ignore'):
+                    phv = ((self._a_np * hv + self._b_np) % np.uint64(_MERSENNE_61)) & np.uint64(_MAX_HASH_32)
+                np.minimum(rt, phv.min(axis=1), out=rt)
+            return tuple(rt.tolist())
+        return tuple(min((((a * hv + b) & _MASK_64) % _MERSENNE_61) & _MAX_HASH_32 for hv in hashes)
+                     for a, b in zip(self._a, self._b))
+
+    def signature(self, doc):
+        """:returns: the MinHash signature of a document (see :func:`shingle_hashes`)"""
+        return self.signature_from_hashes(shingle_hashes(doc, self.n))
+
+    def signatures(self, docs):
+        """:returns: an iterator of signatures for an iterable of documents"""
+        for doc in docs:
+            yield self.signature(doc)
+
+    @staticmethod
+    def jaccard(sig_a, sig_b):
+        """estimated Jaccard similarity of two signatures"""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / float(len(sig_a))
+
+
+class LSHIndex(object):
+    """banded locality sensitive hashing index of MinHash signatures for near duplicate detection,
+    documents sharing all rows of at least one band become candidates. With b bands of r rows the
+    probability to become candidates for similarity s is 1 - (1 - s**r)**b  (threshold ~ (1/b)**(1/r))
+
+    :param MinHasher hasher: a :class:`MinHasher` instance, (defaults to MinHasher())
+    :param int bands: number of bands, must divide hasher.num_perm
+
+    :Example:
+        >>> lsh = LSHIndex(bands=32)
+        >>> lsh.add('a', "the quick brown fox jumps over the lazy dog")
+        >>> lsh.add('b', "the quick brown fox jumps over the lazy dogs")
+        >>> lsh.add('c', "lorem ipsum dolor sit amet")
+        >>> list(lsh.candidate_pairs(0.8))
+        [('a', 'b', 0.984375)]
+    """
+    def __init__(self, hasher=None, bands=32):
+        self.hasher = MinHasher() if hasher is None else hasher
+        if self.hasher.num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self._buckets = [{} for i in range(bands)]        # per band: band values -> [keys]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def __repr__(self):
+        return "<LSHIndex: docs={:,d} bands={:d} rows={:d}>".format(len(self._signatures), self.bands, self.rows)
+
+    def _is_empty(self, signature):
+        return all(i == _MAX_HASH_32 for i in signature)
+
+    def _bands(self, signature):
+        rows = self.rows
+        return [tuple(signature[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+
+    def add(self, key, doc=None, signature=None):
+        """adds a document (or a precomputed signature) under key
+
+        :raises ValueError: if key already exists
+        """
+        if key in self._signatures:
+            raise ValueError("key {!r} already in index".format(key))
+        if signature is None:
+            signature = self.hasher.signature(doc)
+        self._signatures[key] = signature
+        if self._is_empty(signature):                     # empty doc, not a near duplicate of anything
+            return
+        for buckets, band in zip(self._buckets, self._bands(signature)):
+            buckets.setdefault(band, []).append(key)
+
+    def add_many(self, items):
+        """adds an iterable of (key, doc) tuples"""
+        for key, doc in items:
+            self.add(key, doc)
+
+    def query(self, doc=None, signature=None):
+        """:returns: a set of keys of candidate near duplicates of doc (or signature)"""
+        if signature is None:
+            signature = self.hasher.signature(doc)
+        rt = set()
+        if self._is_empty(signature):
+            return rt
+        for buckets, band in zip(self._buckets, self._bands(signature)):
+            rt.update(buckets.get(band, ()))
+        return rt
+
+    def jaccard(self, key_a, key_b):
+        """estimated Jaccard similarity of two indexed documents (0.0 if any of them is empty)"""
+        sig_a, sig_b = self._signatures[key_a], self._signatures[key_b]
+        if self._is_empty(sig_a) or self._is_empty(sig_b):
+            return 0.0
+        return self.hasher.jaccard(sig_a, sig_b)
+
+    def candidate_pairs(self, min_similarity=None):
+        """yields (key_a, key_b, estimated_jaccard) for each pair sharing a band bucket once, in insertion order
+
+        :param float min_similarity: skip pairs with estimated similarity below this
+        """
+        seen = set()
+        order = dict((key, i) for i, key in enumerate(self._signatures))
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                if len(keys) < 2:
+                    continue
+                for i, key_a in enumerate(keys):
+                    for key_b in keys[i + 1:]:
+                        pair = (key_a, key_b) if order[key_a] < order[key_b] else (key_b, key_a)
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        similarity = self.jaccard(*pair)
+                        if min_similarity is None or similarity >= min_similarity:
+                            yield pair + (similarity,)
+
+
 def haversine(lon1, lat1, lon2, lat2, earth_radius=6357000):
     """Calculate the great circle distance between two points on earth in Kilometers
     on the earth (specified in decimal degrees)
@@ -80,6 +433,619 @@ def distance_points(point1, point2, earth_radius=6367000):
     return haversine(point1[0], point1[1], point2[0], point2[1])
 
 
+def _radians_arr(seq):
+    """returns an array('d') of radians from a sequence of decimal degrees (scalars become 1 element arrays)"""
+    if not hasattr(seq, '__len__'):
+        seq = (seq,)
+    radians = math.radians
+    return array('d', [radians(i) for i in seq])
+
+
+def _broadcast(*arrays):
+    """numpy like broadcasting of 1 element arrays for the pure python fallback"""
+    size = max(len(i) for i in arrays)
+    rt = []
+    for i in arrays:
+        if len(i) == size:
+            rt.append(i)
+        elif len(i) == 1:
+            rt.append(array('d', i) * size)
+        else:
+            raise ValueError("can't broadcast arrays of length {:d} and {:d}".format(len(i), size))
+    return rt
+
+
+def haversine_many(lons1, lats1, lons2, lats2, earth_radius=EARTH_RADIUS):
+    """vectorized :func:`haversine` for many pairs of points in a single pass
+
+    :param lons1: longitudes of first places, a numpy array, array('d') or any sequence (decimal degrees)
+    :param lats1: latitudes of first places
+    :param lons2: longitudes of second places
+    :param lats2: latitudes of second places
+    :param earth_radius: see :func:`haversine`
+
+    any of the arguments can be a scalar (or 1 element sequence) which is broadcasted against the others
+
+    :returns: a numpy float64 array if numpy is available else an array('d') of distances
+
+    :Example:
+        >>> haversine_many([-0.126, -0.126], [51.50, 51.50], [2.350, -0.126], [48.856, 51.50])
+        array([ 342015.73834929,       0.        ])
+    """
+    if np is not None:
+        lon1, lat1, lon2, lat2 = [np.radians(np.asarray(i, dtype=np.float64)) for i in (lons1, lats1, lons2, lats2)]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * earth_radius * np.arcsin(np.sqrt(a))
+    lon1, lat1, lon2, lat2 = _broadcast(*[_radians_arr(i) for i in (lons1, lats1, lons2, lats2)])
+    sin, cos, asin, sqrt = math.sin, math.cos, math.asin, math.sqrt
+    diameter = 2 * earth_radius
+    return array('d', [diameter * asin(sqrt(sin((la2 - la1) / 2) ** 2 + cos(la1) * cos(la2) * sin((lo2 - lo1) / 2) ** 2))
+                       for lo1, la1, lo2, la2 in zip(lon1, lat1, lon2, lat2)])
+
+
+def _lons_lats(points):
+    """splits a sequence of (longitude, latitude) points or a (n, 2) numpy array to longitudes, latitudes"""
+    if np is not None:
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points[:, 0], points[:, 1]
+    return array('d', [i[0] for i in points]), array('d', [i[1] for i in points])
+
+
+def distance_matrix_chunks(points_a, points_b, earth_radius=EARTH_RADIUS, chunk_mb=32):
+    """yields the pairwise :func:`haversine` distance matrix between points_a and points_b in row chunks
+    so that memory stays bounded by chunk_mb regardless of matrix size
+
+    :param points_a: sequence of (longitude, latitude) points or a (n, 2) numpy array (decimal degrees)
+    :param points_b: sequence of (longitude, latitude) points or a (m, 2) numpy array (decimal degrees)
+    :param int chunk_mb: approximate memory budget in MegaBytes for each chunk (including temporaries)
+    :returns: an iterator of (row_start, rows) tuples where rows is a (k, m) numpy array
+              or a list of k array('d') rows when numpy is not available
+    """
+    lons_a, lats_a = _lons_lats(points_a)
+    lons_b, lats_b = _lons_lats(points_b)
+    cols = max(len(lons_b), 1)
+    chunk_rows = max(1, int((chunk_mb * 1024 * 1024) // (cols * 8 * 6)))    # ~ 6 float64 temporaries per cell
+    diameter = 2 * earth_radius
+    if np is not None:
+        lon_b, lat_b = np.radians(lons_b), np.radians(lats_b)
+        cos_b = np.cos(lat_b)
+        for start in range(0, len(lons_a), chunk_rows):
+            lon_a = np.radians(lons_a[start:start + chunk_rows])[:, None]
+            lat_a = np.radians(lats_a[start:start + chunk_rows])[:, None]
+            a = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * cos_b * np.sin((lon_b - lon_a) / 2) ** 2
+            yield start, diameter * np.arcsin(np.sqrt(a))
+        return
+    sin, cos, asin, sqrt = math.sin, math.cos, math.asin, math.sqrt
+    lon_b, lat_b = _radians_arr(lons_b), _radians_arr(lats_b)
+    cos_b = array('d', [cos(i) for i in lat_b])
+    b = list(zip(lon_b, lat_b, cos_b))
+    lon_a, lat_a = _radians_arr(lons_a), _radians_arr(lats_a)
+    for start in range(0, len(lon_a), chunk_rows):
+        rows = []
+        for lo1, la1 in zip(lon_a[start:start + chunk_rows], lat_a[start:start + chunk_rows]):
+            cos_la1 = cos(la1)
+            rows.append(array('d', [diameter * asin(sqrt(sin((la2 - la1) / 2) ** 2 + cos_la1 * cos_la2 * sin((lo2 - lo1) / 2) ** 2))
+                                    for lo2, la2, cos_la2 in b]))
+        yield start, rows
+
+
+def distance_matrix(points_a, points_b, earth_radius=EARTH_RADIUS, chunk_mb=32):
+    """pairwise :func:`haversine` distances between two sets of points
+
+    .. seealso:: :func:`distance_matrix_chunks` for matrices that don't fit in memory
+
+    :param points_a: sequence of (longitude, latitude) points or a (n, 2) numpy array (decimal degrees)
+    :param points_b: sequence of (longitude, latitude) points or a (m, 2) numpy array (decimal degrees)
+    :returns: a (n, m) numpy array or a list of n array('d') rows when numpy is not available
+
+    :Example:
+        >>> London = (-0.1262, 51.50,); Paris = (2.350, 48.856)
+        >>> distance_matrix([London, Paris], [London, Paris])
+        array([[      0.       , 342023.0400813],
+               [342023.0400813,      0.       ]])
+    """
+    if np is not None:
+        points_a = np.asarray(points_a, dtype=np.float64).reshape(-1, 2)
+        points_b = np.asarray(points_b, dtype=np.float64).reshape(-1, 2)
+        rt = np.empty((len(points_a), len(points_b)), dtype=np.float64)
+        for start, rows in distance_matrix_chunks(points_a, points_b, earth_radius, chunk_mb):
+            rt[start:start + len(rows)] = rows
+        return rt
+    rt = []
+    for start, rows in distance_matrix_chunks(points_a, points_b, earth_radius, chunk_mb):
+        rt.extend(rows)
+    return rt
+
+
+def _unwrap_lons(lons):
+    """removes +-360 jumps of tracks crossing the anti meridian (pure python counterpart of numpy.unwrap)"""
+    rt = array('d')
+    offset, prev = 0.0, None
+    for lon in lons:
+        if prev is not None:
+            delta = lon - prev
+            if delta > 180.0:
+                offset -= 360.0
+            elif delta < -180.0:
+                offset += 360.0
+        prev = lon
+        rt.append(lon + offset)
+    return rt
+
+
+def track_segments(lons, lats, times=None, earth_radius=EARTH_RADIUS, start=None, cumulative_start=0.0):
+    """vectorized segment distances, cumulative distance and speeds of a track
+
+    :param lons: longitudes a numpy array, array('d') or any sequence (decimal degrees)
+    :param lats: latitudes
+    :param times: optional timestamps in seconds (any monotonic numbers)
+    :param tuple start: optional previous (lon, lat, t) point that the track continues from (used for chunking)
+    :param float cumulative_start: distance already covered before this track (used for chunking)
+    :returns: a tuple (distances, cumulative, speeds) of numpy arrays (or array('d') without numpy),
+              each point gets the segment that ends on it, first point gets 0 unless start is given,
+              speeds are distance units per time unit (0 where time doesn't advance) or None if no times
+
+    :Example:
+        >>> track_segments([23.72, 23.73, 23.74], [37.98, 37.98, 37.99], [0, 60, 120])
+        (array([   0.  ,  874.54, 1412.7 ]), array([   0.  ,  874.54, 2287.24]), array([ 0.  , 14.58, 23.54]))
+    """
+    if np is not None:
+        lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+        prev_lons, prev_lats = np.empty_like(lons), np.empty_like(lats)
+        prev_lons[1:], prev_lats[1:] = lons[:-1], lats[:-1]
+        if len(lons):
+            prev_lons[0], prev_lats[0] = (start[0], start[1]) if start is not None else (lons[0], lats[0])
+        distances = haversine_many(prev_lons, prev_lats, lons, lats, earth_radius)
+        cumulative = np.cumsum(distances) + cumulative_start
+        speeds = None
+        if times is not None:
+            times = np.asarray(times, dtype=np.float64)
+            dts = np.empty_like(times)
+            dts[1:] = times[1:] - times[:-1]
+            if len(times):
+                dts[0] = times[0] - start[2] if start is not None else 0.0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                speeds = np.where(dts > 0, distances / dts, 0.0)
+        return distances, cumulative, speeds
+    lons, lats = array('d', lons), array('d', lats)
+    if not len(lons):
+        return array('d'), array('d'), None if times is None else array('d')
+    first = (start[0], start[1]) if start is not None else (lons[0], lats[0])
+    distances = haversine_many(array('d', [first[0]]) + lons[:-1], array('d', [first[1]]) + lats[:-1], lons, lats, earth_radius)
+    cumulative, total = array('d'), cumulative_start
+    for distance in distances:
+        total += distance
+        cumulative.append(total)
+    speeds = None
+    if times is not None:
+        times = array('d', times)
+        prev_times = array('d', [start[2] if start is not None else times[0]]) + times[:-1]
+        speeds = array('d', [d / (t - pt) if t > pt else 0.0 for d, t, pt in zip(distances, times, prev_times)])
+    return distances, cumulative, speeds
+
+
+def track_segments_stream(points, chunk_size=100000, earth_radius=EARTH_RADIUS):
+    """:func:`track_segments` over a (possibly endless) iterator of (lon, lat, t) points in chunks,
+    memory stays constant regardless of track length
+
+    :param iterable points: iterable of (lon, lat, t) tuples
+    :returns: an iterator of (distances, cumulative, speeds) per chunk, see :func:`track_segments`
+    """
+    it = iter(points)
+    start, total = None, 0.0
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        lons, lats, times = zip(*chunk)
+        distances, cumulative, speeds = track_segments(lons, lats, times, earth_radius, start, total)
+        start, total = chunk[-1], cumulative[-1]
+        yield distances, cumulative, speeds
+
+
+def track_length(points, chunk_size=100000, earth_radius=EARTH_RADIUS):
+    """total length of a track given as an iterable of (lon, lat, t) or (lon, lat) points, in constant memory"""
+    total = 0.0
+    for distances, cumulative, speeds in track_segments_stream(((p[0], p[1], 0) for p in points), chunk_size, earth_radius):
+        total = cumulative[-1]
+    return total
+
+
+def douglas_peucker_indexes(lons, lats, tolerance, earth_radius=EARTH_RADIUS):
+    """indexes of points kept by Douglas-Peucker simplification
+
+    distances to each anchor segment are measured in a local equirectangular projection around the segment
+    (accurate for segments up to a few hundred Km) and computed with numpy for all points of a segment at once
+
+    :param lons: longitudes a numpy array, array('d') or any sequence (decimal degrees)
+    :param lats: latitudes
+    :param float tolerance: maximum deviation in earth_radius units (meters by default)
+    :returns: a sorted list of indexes (first and last are always included)
+    """
+    size = len(lons)
+    if size < 3:
+        return list(range(size))
+    k = math.pi / 180.0 * earth_radius               # meters per degree of latitude
+    if np is not None:
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        lons = lons[0] + np.concatenate(([0.0], np.cumsum((np.diff(lons) + 180.0) % 360.0 - 180.0)))
+    else:
+        lons, lats = _unwrap_lons(lons), array('d', lats)
+    keep = [0, size - 1]
+    stack = [(0, size - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        kx = k * math.cos(math.radians((lats[first] + lats[last]) / 2.0))
+        ax, ay = lons[first] * kx, lats[first] * k
+        dx, dy = lons[last] * kx - ax, lats[last] * k - ay
+        seg_len2 = dx * dx + dy * dy
+        if np is not None:
+            px, py = lons[first + 1:last] * kx - ax, lats[first + 1:last] * k - ay
+            if seg_len2 > 0:
+                t = np.clip((px * dx + py * dy) / seg_len2, 0.0, 1.0)
+                px, py = px - t * dx, py - t * dy
+            dists = px * px + py * py
+            idx = int(np.argmax(dists))
+            max_dist, idx = dists[idx], idx + first + 1
+        else:
+            max_dist, idx = -1.0, first
+            for i in range(first + 1, last):
+                px, py = lons[i] * kx - ax, lats[i] * k - ay
+                if seg_len2 > 0:
+                    t = min(max((px * dx + py * dy) / seg_len2, 0.0), 1.0)
+                    px, py = px - t * dx, py - t * dy
+                dist = px * px + py * py
+                if dist > max_dist:
+                    max_dist, idx = dist, i
+        if max_dist > tolerance * tolerance:
+            keep.append(idx)
+            stack.append((first, idx))
+            stack.append((idx, last))
+    return sorted(keep)
+
+
+def douglas_peucker(points, tolerance, earth_radius=EARTH_RADIUS):
+    """simplifies a track with Douglas-Peucker, see :func:`douglas_peucker_indexes`
+
+    :param points: a sequence of (lon, lat, ...) points or a (n, >=2) numpy array
+    :param float tolerance: maximum deviation in earth_radius units (meters by default)
+    :returns: a list with the kept points
+
+    :Example:
+        >>> douglas_peucker([(23.72, 37.98, 0), (23.7201, 37.98, 1), (23.73, 37.99, 2)], 100)
+        [(23.72, 37.98, 0), (23.73, 37.99, 2)]
+    """
+    lons, lats = [p[0] for p in points], [p[1] for p in points]
+    return [points[i] for i in douglas_peucker_indexes(lons, lats, tolerance, earth_radius)]
+
+
+class GeoGridIndex(object):
+    """a lat/lon grid spatial index for radius and nearest neighbour queries, distances are computed by
+    :func:`haversine` with the same earth_radius so results are identical to a brute force scan
+
+    :param iterable items: optional iterable of (key, longitude, latitude) for bulk build
+    :param float cell_deg: grid cell size in decimal degrees, choose it close to typical query radius
+        (longitude cells are snapped to the nearest width that divides 360 so the grid wraps at the antimeridian)
+    :param earth_radius: see :func:`haversine`
+
+    :Example:
+        >>> idx = GeoGridIndex([('London', -0.1262, 51.50), ('Paris', 2.350, 48.856), ('Athens', 23.727, 37.983)])
+        >>> idx.within_radius((-0.1262, 51.50), 400000)
+        [(0.0, 'London'), (342023.0400813, 'Paris')]
+        >>> idx.nearest((23.7, 38.0), 1)
+        [(3021.8209976, 'Athens')]
+    """
+    def __init__(self, items=None, cell_deg=0.1, earth_radius=EARTH_RADIUS):
+        self.cell_deg = float(cell_deg)
+        self.earth_radius = earth_radius
+        self._lon_cells = max(1, int(round(360.0 / self.cell_deg)))
+        self._lon_deg = 360.0 / self._lon_cells     # whole number of cells around, no partial cell at +180
+        self._cells = {}            # (lat_cell, lon_cell) -> {key: (lon, lat)}
+        self._points = {}           # key -> (lon, lat)
+        if items is not None:
+            self.build(items)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def __repr__(self):
+        return "<GeoGridIndex: points={:,d} cells={:,d} cell_deg={}>".format(len(self._points), len(self._cells), self.cell_deg)
+
+    def _cell(self, lon, lat):
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor((lon + 180.0) / self._lon_deg)) % self._lon_cells)
+
+    def build(self, items):
+        """bulk inserts an iterable of (key, longitude, latitude)"""
+        cells, points, cell = self._cells, self._points, self._cell
+        for key, lon, lat in items:
+            if key in points:
+                self.delete(key)
+            points[key] = (lon, lat)
+            cells.setdefault(cell(lon, lat), {})[key] = (lon, lat)
+
+    def insert(self, key, lon, lat):
+        """inserts (or moves if key exists) a point"""
+        self.build(((key, lon, lat),))
+
+    def delete(self, key):
+        """removes a point
+
+        :raises KeyError: if key is not in index
+        """
+        lon, lat = self._points.pop(key)
+        cell = self._cell(lon, lat)
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def _candidate_cells(self, lon, lat, radius):
+        """cells that intersect the bounding box of a great circle of radius around (lon, lat)"""
+        angular = radius / float(self.earth_radius)
+        if angular >= math.pi:
+            return list(self._cells.keys())
+        eps = 1e-9
+        dlat = math.degrees(angular) + eps
+        lat_min, lat_max = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        cos_lat = math.cos(math.radians(lat))
+        if lat_max >= 90.0 or lat_min <= -90.0 or math.sin(angular) >= cos_lat:
+            lon_range = range(self._lon_cells)
+        else:
+            dlon = math.degrees(math.asin(math.sin(angular) / cos_lat)) + eps
+            if 2 * dlon >= 360.0 - self._lon_deg:
+                lon_range = range(self._lon_cells)
+            else:
+                first = int(math.floor((lon - dlon + 180.0) / self._lon_deg))
+                last = int(math.floor((lon + dlon + 180.0) / self._lon_deg))
+                lon_range = [i % self._lon_cells for i in range(first, last + 1)]
+        lat_range = range(int(math.floor(lat_min / self.cell_deg)), int(math.floor(lat_max / self.cell_deg)) + 1)
+        if len(lat_range) * len(lon_range) > len(self._cells):     # cheaper to walk occupied cells
+            lat_first, lat_last, lon_set = lat_range[0], lat_range[-1], set(lon_range)
+            return [c for c in self._cells if lat_first <= c[0] <= lat_last and c[1] in lon_set]
+        return [(i, j) for i in lat_range for j in lon_range]
+
+    def within_radius(self, point, radius):
+        """
+        :param tuple point: (longitude, latitude) in decimal degrees
+        :param float radius: search radius in earth_radius units (meters by default)
+        :returns: a list of (distance, key) tuples sorted by distance
+        """
+        lon, lat = point[0], point[1]
+        earth_radius, cells = self.earth_radius, self._cells
+        rt = []
+        for cell in self._candidate_cells(lon, lat, radius):
+            bucket = cells.get(cell)
+            if bucket:
+                for key, (plon, plat) in bucket.items():
+                    distance = haversine(lon, lat, plon, plat, earth_radius)
+                    if distance <= radius:
+                        rt.append((distance, key))
+        rt.sort(key=lambda x: x[0])
+        return rt
+
+    def nearest(self, point, k=1):
+        """k nearest points, search radius doubles until k points are found
+
+        :param tuple point: (longitude, latitude) in decimal degrees
+        :param int k: number of neighbours
+        :returns: a list of up to k (distance, key) tuples sorted by distance
+        """
+        if k <= 0 or not self._points:
+            return []
+        k = min(k, len(self._points))
+        radius = math.radians(self.cell_deg) * self.earth_radius
+        max_radius = math.pi * self.earth_radius
+        while True:
+            rt = self.within_radius(point, radius)
+            if len(rt) >= k or radius > max_radius:
+                return rt[:k]
+            radius *= 2
+
+
+#   geohash see: https://en.wikipedia.org/wiki/Geohash
+
+GEOHASH_SYMBOLS = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_DECODE = dict((ch, i) for i, ch in enumerate(GEOHASH_SYMBOLS))
+
+
+def _spread_bits(x):
+    """spreads the lower 32 bits of x to even bit positions (works for ints and numpy uint64 arrays)"""
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    return (x | (x << 1)) & 0x5555555555555555
+
+
+def _squash_bits(x):
+    """reverse of :func:`_spread_bits`"""
+    x = x & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    return (x | (x >> 16)) & 0x00000000FFFFFFFF
+
+
+def _geohash_bits(precision):
+    """:returns: (longitude bits, latitude bits) for a geohash of precision characters"""
+    if not 1 <= precision <= 12:
+        raise ValueError("geohash precision must be between 1 and 12")
+    total = precision * 5
+    return (total + 1) // 2, total // 2
+
+
+def _geohash_interleave(lon_int, lat_int, precision):
+    if precision % 2:                # odd number of bits, longitude takes the most significant one
+        return _spread_bits(lon_int) | (_spread_bits(lat_int) << 1)
+    return (_spread_bits(lon_int) << 1) | _spread_bits(lat_int)
+
+
+def _geohash_deinterleave(code, precision):
+    if precision % 2:
+        return _squash_bits(code), _squash_bits(code >> 1)
+    return _squash_bits(code >> 1), _squash_bits(code)
+
+
+def _geohash_to_str(code, precision):
+    return ''.join([GEOHASH_SYMBOLS[(code >> (5 * i)) & 31] for i in range(precision - 1, -1, -1)])
+
+
+def _geohash_from_str(geohash):
+    code = 0
+    try:
+        for ch in geohash:
+            code = (code << 5) | _GEOHASH_DECODE[ch]
+    except KeyError:
+        raise ValueError("invalid geohash {!r}".format(geohash))
+    return code
+
+
+def geohash_encode(lon, lat, precision=9):
+    """encodes a point to a geohash string
+
+    :param float lon: longitude (decimal degrees)
+    :param float lat: latitude (decimal degrees)
+    :param int precision: number of characters (1-12), 9 gives a cell of about 5 x 5 meters
+        (out of range coordinates are clamped to the edge cells like :func:`geohash_encode_many` does)
+
+    :Example:
+        >>> geohash_encode(23.727, 37.983, 7)
+        'swbb5ft'
+    """
+    lon_bits, lat_bits = _geohash_bits(precision)
+    lon_int = max(0, min(int(math.floor((lon + 180.0) * ((1 << lon_bits) / 360.0))), (1 << lon_bits) - 1))
+    lat_int = max(0, min(int(math.floor((lat + 90.0) * ((1 << lat_bits) / 180.0))), (1 << lat_bits) - 1))
+    return _geohash_to_str(_geohash_interleave(lon_int, lat_int, precision), precision)
+
+
+def geohash_bbox(geohash):
+    """:returns: (lon_min, lat_min, lon_max, lat_max) of a geohash cell"""
+    precision = len(geohash)
+    lon_bits, lat_bits = _geohash_bits(precision)
+    lon_int, lat_int = _geohash_deinterleave(_geohash_from_str(geohash), precision)
+    lon_size, lat_size = 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+    lon_min, lat_min = lon_int * lon_size - 180.0, lat_int * lat_size - 90.0
+    return lon_min, lat_min, lon_min + lon_size, lat_min + lat_size
+
+
+def geohash_decode(geohash):
+    """:returns: (longitude, latitude) of the center of a geohash cell
+
+    :Example:
+        >>> geohash_decode('swbb5ft')
+        (23.727035522460938, 37.98316955566406)
+    """
+    lon_min, lat_min, lon_max, lat_max = geohash_bbox(geohash)
+    return (lon_min + lon_max) / 2, (lat_min + lat_max) / 2
+
+
+def geohash_neighbours(geohash):
+    """:returns: a list with the geohashes of the (up to) 8 cells surrounding geohash
+                 (there are no neighbours beyond the poles, longitude wraps around)
+    """
+    precision = len(geohash)
+    lon_bits, lat_bits = _geohash_bits(precision)
+    lon_int, lat_int = _geohash_deinterleave(_geohash_from_str(geohash), precision)
+    lon_cells, lat_cells = 1 << lon_bits, 1 << lat_bits
+    rt = []
+    for dlat in (1, 0, -1):
+        lat_n = lat_int + dlat
+        if not 0 <= lat_n < lat_cells:
+            continue
+        for dlon in (-1, 0, 1):
+            if dlat == 0 and dlon == 0:
+                continue
+            rt.append(_geohash_to_str(_geohash_interleave((lon_int + dlon) % lon_cells, lat_n, precision), precision))
+    return rt
+
+
+def geohash_encode_many(lons, lats, precision=9):
+    """vectorized :func:`geohash_encode`
+
+    :param lons: longitudes a numpy array, array('d') or any sequence (decimal degrees)
+    :param lats: latitudes
+    :returns: a numpy unicode array if numpy is available else a list of geohash strings
+    """
+    lon_bits, lat_bits = _geohash_bits(precision)
+    if np is None:
+        return [geohash_encode(lon, lat, precision) for lon, lat in zip(lons, lats)]
+    lon_int = np.floor((np.asarray(lons, dtype=np.float64) + 180.0) * ((1 << lon_bits) / 360.0))
+    lat_int = np.floor((np.asarray(lats, dtype=np.float64) + 90.0) * ((1 << lat_bits) / 180.0))
+    lon_int = np.clip(lon_int, 0, (1 << lon_bits) - 1).astype(np.uint64)
+    lat_int = np.clip(lat_int, 0, (1 << lat_bits) - 1).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        code = _geohash_interleave(lon_int, lat_int, precision)
+    shifts = np.arange(5 * (precision - 1), -1, -5, dtype=np.uint64)
+    idx = (code[:, None] >> shifts) & np.uint64(31)
+    chars = np.frombuffer(GEOHASH_SYMBOLS.encode('ascii'), dtype=np.uint8)[idx.astype(np.intp)]
+    return np.ascontiguousarray(chars).view('S{:d}'.format(precision)).ravel().astype('U{:d}'.format(precision))
+
+
+def geohash_decode_many(geohashes):
+    """vectorized :func:`geohash_decode` for geohashes of equal length
+
+    :returns: (longitudes, latitudes) numpy arrays if numpy is available else array('d')
+    """
+    if np is None:
+        centers = [geohash_decode(i) for i in geohashes]
+        return array('d', [i[0] for i in centers]), array('d', [i[1] for i in centers])
+    geohashes = np.asarray(geohashes).astype('S')
+    precision = geohashes.dtype.itemsize
+    lon_bits, lat_bits = _geohash_bits(precision)
+    table = np.full(256, 255, dtype=np.uint8)
+    table[np.frombuffer(GEOHASH_SYMBOLS.encode('ascii'), dtype=np.uint8)] = np.arange(32, dtype=np.uint8)
+    values = table[geohashes.view(np.uint8).reshape(-1, precision)]
+    if (values == 255).any():
+        raise ValueError("invalid or unequal length geohashes")
+    code = np.zeros(len(values), dtype=np.uint64)
+    for i in range(precision):
+        code = (code << np.uint64(5)) | values[:, i].astype(np.uint64)
+    lon_int, lat_int = _geohash_deinterleave(code, precision)
+    lon_size, lat_size = 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+    return (lon_int + 0.5) * lon_size - 180.0, (lat_int + 0.5) * lat_size - 90.0
+
+
+def geohash_buckets(points, precision=6, chunk_size=100000):
+    """groups a (possibly huge) stream of points by geohash in chunks using :func:`geohash_encode_many`
+
+    :param iterable points: iterable of tuples or lists with (longitude, latitude, ...anything else)
+    :param int precision: geohash length of the buckets
+    :returns: a dictionary {geohash: [point, ...]}
+
+    .. seealso:: :func:`geohash_candidates`
+    """
+    rt = {}
+    it = iter(points)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return rt
+        hashes = geohash_encode_many([i[0] for i in chunk], [i[1] for i in chunk], precision)
+        for geohash, point in zip(hashes, chunk):
+            rt.setdefault(str(geohash), []).append(point)
+
+
+def geohash_candidates(buckets, point, precision=6):
+    """points in the same or adjacent cells of point, use it to limit :func:`haversine` calls to nearby points
+
+    :param dict buckets: a dictionary produced by :func:`geohash_buckets` with the same precision
+    :param tuple point: (longitude, latitude)
+    :returns: a list of points
+    """
+    geohash = geohash_encode(point[0], point[1], precision)
+    rt = list(buckets.get(geohash, []))
+    for i in geohash_neighbours(geohash):
+        rt.extend(buckets.get(i, []))
+    return rt
+
+
 def dms2dd(degrees, minutes, seconds, direction):
     """convert degrees, minutes, seconds to dd
     :param string direction: one of N S W E
@@ -88,6 +1054,154 @@ def dms2dd(degrees, minutes, seconds, direction):
     return dd * -1 if direction == 'S' or direction == 'W' else dd
 
 
+_DMS_RE = re.compile(
+    r"^[ \t]*([NSEWnsew]?)[ \t]*(-?)(\d+(?:\.\d+)?)[ \t°º:d]*"                 # [direction] [-]degrees
+    r"(?:(\d+(?:\.\d+)?)[ \t'′:m]*(?:(\d+(?:\.\d+)?)[ \t\"″'s]*)?)?"            # [minutes [seconds]]
+    r"([NSEWnsew]?)[ \t]*$|^(.*)$", re.M)                                # [direction] | anything else is an error
+_DMS_SIGNS = dict([(m + d, (-1 if m else 1) * (-1 if d and d in 'SWsw' else 1)) for m in ('', '-') for d in ('',) + tuple('NSEWnsew')])
+_DMS_UNIFORM_SEPARATORS = u'°º′″'
+_DMS_UNIFORM_TABLE = bytes.maketrans(b':\'"\t\nEW', b'    ;NS')
+
+
+def _dms_columns_regex(dms_strings):
+    """parses all rows in a single pass of :data:`_DMS_RE` over the joined text
+
+    :returns: (degrees, minutes, seconds, signs) array('d') columns, degrees is NaN for rows that can't be parsed
+              and sign 0 for rows with two directions
+    """
+    try:
+        rows = _DMS_RE.findall('\n'.join(dms_strings))
+    except TypeError:
+        rows = None
+    if rows is None or len(rows) != len(dms_strings):      # non strings or multi line values
+        rows = _DMS_RE.findall('\n'.join([i if isinstance(i, str) and '\n' not in i else '' for i in dms_strings]))
+    dir_pre, minus, degrees, minutes, seconds, dir_post, bad = [list(map(itemgetter(i), rows)) for i in range(7)]
+    signs = array('d', map(_DMS_SIGNS.get, map(add, map(add, minus, dir_pre), dir_post), repeat(0)))
+    degrees = array('d', map(float, [i or 'nan' for i in degrees]))
+    minutes = array('d', map(float, [i or '0' for i in minutes]))
+    seconds = array('d', map(float, [i or '0' for i in seconds]))
+    return degrees, minutes, seconds, signs
+
+
+def _dms_columns_uniform(dms_strings):
+    """fast path for the common case of a column where all rows share the same layout (i.e. all are like 37°58'46"N)
+    separators are translated to spaces and the whole column is split at once so there is no per row parsing
+
+    :returns: same as :func:`_dms_columns_regex` or None if rows are not uniform so the regex path must be used
+    """
+    size = len(dms_strings)
+    try:
+        text = '\n'.join(dms_strings)
+        for separator in _DMS_UNIFORM_SEPARATORS:
+            text = text.replace(separator, ' ')
+        data = text.encode('ascii')
+    except (TypeError, UnicodeError):
+        return None
+    data = data.translate(_DMS_UNIFORM_TABLE)
+    if data.translate(None, b'0123456789.- NS;'):
+        return None                             # i.e. 1e5, nan, inf, lower case or unit letters, leave it to the regex
+    tokens = data.replace(b';', b' ; ').replace(b'N', b' N ').replace(b'S', b' S ').decode('ascii').split()
+    tokens.append(';')
+    width = tokens.index(';') + 1
+    if len(tokens) != size * width or tokens[width - 1::width].count(';') != size:
+        return None
+    columns = [tokens[i::width] for i in range(width - 1)]
+    directions = None
+    if columns and columns[-1][0] in ('N', 'S'):
+        directions = columns.pop()
+    elif columns and columns[0][0] in ('N', 'S'):
+        directions = columns.pop(0)
+    if not 1 <= len(columns) <= 3 or (directions is not None and directions.count('N') + directions.count('S') != size):
+        return None
+    try:
+        columns = [array('d', map(float, i)) for i in columns]
+    except ValueError:
+        return None
+    degrees = columns[0]
+    minutes = columns[1] if len(columns) > 1 else array('d', [0.0]) * size
+    seconds = columns[2] if len(columns) > 2 else array('d', [0.0]) * size
+    if len(columns) > 1 and min(minutes) < 0 or len(columns) > 2 and min(seconds) < 0:
+        return None                             # only degrees can be negative
+    signs = array('d', map(math.copysign, repeat(1.0), degrees))
+    if directions is not None:
+        signs = array('d', map(mul, signs, map(_DMS_SIGNS.__getitem__, directions)))
+    return array('d', map(abs, degrees)), minutes, seconds, signs
+
+
+def dms2dd_many(dms_strings):
+    """bulk :func:`dms2dd` from DMS strings like 37°58'46"N, 37 58 46.5 S, W 23:43:38, 37°58.5'N or -23 43 38
+    columns with a uniform layout are split all at once, others are parsed in a single pass of a precompiled
+    multi line regex, arithmetic is done on whole arrays (numpy if available)
+
+    :param iterable dms_strings: any iterable of strings (i.e. a csv column see :func:`dms2dd_column`)
+    :returns: a tuple (values, errors) values is a packed float array('d') (NaN for rows in error),
+              errors a list of (row_index, value, error message) tuples
+
+    :Example:
+        >>> dms2dd_many([u'37°58\'46"N', '23 43 38 W', 'foo'])
+        (array('d', [37.97944444444445, -23.72722222222222, nan]), [(2, 'foo', "can't parse DMS")])
+    """
+    dms_strings = dms_strings if isinstance(dms_strings, list) else list(dms_strings)
+    if not dms_strings:
+        return array('d'), []
+    columns = _dms_columns_uniform(dms_strings) or _dms_columns_regex(dms_strings)
+    if np is not None:
+        degrees, minutes, seconds, signs = [np.frombuffer(i, dtype=np.float64) for i in columns]
+        dd = (degrees + minutes / 60.0 + seconds / 3600.0) * signs
+        invalid = np.isnan(dd) | (minutes >= 60) | (seconds >= 60) | (signs == 0)
+        dd[invalid] = np.nan
+        values, rows = array('d', dd.tobytes()), np.flatnonzero(invalid).tolist()
+    else:
+        degrees, minutes, seconds, signs = columns
+        nan = float('nan')
+        values = array('d', [(d + m / 60.0 + s / 3600.0) * sign if m < 60 and s < 60 and sign else nan
+                             for d, m, s, sign in zip(degrees, minutes, seconds, signs)])
+        rows = [row for row, vl in enumerate(values) if vl != vl]
+    errors = []
+    for row in rows:
+        msg = ("can't parse DMS" if degrees[row] != degrees[row] else "two directions in DMS" if signs[row] == 0
+               else "minutes or seconds out of range in DMS")
+        errors.append((row, dms_strings[row], msg))
+    return values, errors
+
+
+def dms2dd_column(file_obj, column, delimiter=',', skip_header=True):
+    """:func:`dms2dd_many` on a column of a csv file
+
+    :param file_obj: a text file like object
+    :param int column: zero based column index
+    :returns: see :func:`dms2dd_many` (row indexes don't count the header)
+    """
+    import csv
+    reader = csv.reader(file_obj, delimiter=delimiter)
+    if skip_header:
+        next(reader, None)
+    return dms2dd_many(row[column] if len(row) > column else '' for row in reader)
+
+
+def benchmark_dms2dd(rows=10 ** 5, seed=0):
+    """compares :func:`dms2dd_many` with a loop that parses each string with the same regex and calls :func:`dms2dd`
+
+    :returns: a dictionary with seconds and rows per second for each approach
+    """
+    from random import Random
+    rnd = Random(seed)
+    data = [u'{:d}°{:d}\'{:d}"{}'.format(rnd.randint(0, 89), rnd.randint(0, 59), rnd.randint(0, 59), rnd.choice('NS'))
+            for i in range(rows)]
+    started = _timer()
+    loop, match = [], _DMS_RE.match
+    for dms_str in data:
+        dir_pre, minus, d, m, s, dir_post, bad = match(dms_str).groups()
+        loop.append(dms2dd(float(d), float(m or 0), float(s or 0), dir_pre or dir_post))
+    loop_secs = _timer() - started
+    started = _timer()
+    bulk, errors = dms2dd_many(data)
+    bulk_secs = _timer() - started
+    assert not errors and all(abs(a - b) < 1e-9 for a, b in zip(loop, bulk))
+    return {'loop_secs': loop_secs, 'loop_rows_per_sec': rows / loop_secs,
+            'bulk_secs': bulk_secs, 'bulk_rows_per_sec': rows / bulk_secs}
+
+
 #   some bit wise operations see: https://wiki.python.org/moin/BitManipulation
 
 def bit_set(offset, int_tp=0):
@@ -123,4 +1237,210 @@ def bit_len(int_type):
     while (int_type):
         int_type >>= 1
         length += 1
-    return(length)
\ No newline at end of file
+    return(length)
+
+
+_POPCOUNT_TABLE = bytes(bytearray(bin(i).count("1") for i in range(256)))
+_BIT_POSITIONS = [tuple(j for j in range(8) if i >> j & 1) for i in range(256)]
+
+
+class Bitmap(object):
+    """a compact bitset backed by a bytearray (or any writable buffer i.e. an mmap) for large membership sets,
+    bit i lives in byte i // 8 at position i % 8 (little endian bit order) so serialized bitmaps are portable
+
+    :param int size: number of bits
+    :param data: optional bytes like object to initialize from (copied, bits beyond size are cleared),
+        see :meth:`from_buffer` for zero copy
+
+    :Example:
+        >>> bm = Bitmap(16)
+        >>> bm.set(2); bm.set(11)
+        >>> list(bm), bm.popcount(), 11 in bm
+        ([2, 11], 2, True)
+        >>> (bm | Bitmap.from_iter(16, [3])).to_bytes()
+        b'\\x0c\\x08'
+    """
+    __slots__ = ['size', '_data']
+
+    def __init__(self, size, data=None):
+        self.size = size
+        nbytes = (size + 7) // 8
+        if data is None:
+            self._data = bytearray(nbytes)
+        else:
+            if len(data) < nbytes:
+                raise ValueError("data too short for {:,d} bits".format(size))
+            self._data = bytearray(data[:nbytes])
+            if size & 7:
+                self._data[-1] &= self._last_mask()
+
+    @classmethod
+    def from_iter(cls, size, offsets):
+        """a new Bitmap with bits in offsets set"""
+        rt = cls(size)
+        rt.set_many(offsets)
+        return rt
+
+    @classmethod
+    def from_bytes(cls, data, size=None):
+        """a new Bitmap from bytes produced by :meth:`to_bytes`, size defaults to 8 * len(data)"""
+        return cls(len(data) * 8 if size is None else size, data)
+
+    @classmethod
+    def from_buffer(cls, buf, size=None):
+        """a Bitmap that shares memory with a writable buffer (no copy) i.e. an mmap of a file written with
+        :meth:`to_bytes` or :meth:`tofile`, changes to the bitmap are reflected in the buffer
+        (the buffer is not modified on construction, bits beyond size are ignored)
+
+        :raises ValueError: if buf is too short for size bits
+        """
+        rt = cls.__new__(cls)
+        view = memoryview(buf).cast('B')
+        rt.size = len(view) * 8 if size is None else size
+        nbytes = (rt.size + 7) // 8
+        if len(view) < nbytes:
+            raise ValueError("buffer too short for {:,d} bits".format(rt.size))
+        rt._data = view[:nbytes]
+        return rt
+
+    def __repr__(self):
+        return "<Bitmap: size={:,d} set={:,d}>".format(self.size, self.popcount())
+
+    def __len__(self):
+        return self.size
+
+    def _last_mask(self):
+        """mask of the bits of the last byte that are within size"""
+        return (1 << (self.size & 7)) - 1 if self.size & 7 else 0xFF
+
+    def _check(self, offset):
+        if not 0 <= offset < self.size:
+            raise IndexError("bit offset {} out of range".format(offset))
+
+    def set(self, offset):
+        self._check(offset)
+        self._data[offset >> 3] |= 1 << (offset & 7)
+
+    def clear(self, offset):
+        self._check(offset)
+        self._data[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+    def test(self, offset):
+        self._check(offset)
+        return bool(self._data[offset >> 3] & (1 << (offset & 7)))
+
+    __contains__ = test
+    __getitem__ = test
+
+    def set_many(self, offsets):
+        data, size = self._data, self.size
+        for offset in offsets:
+            if not 0 <= offset < size:
+                raise IndexError("bit offset {} out of range".format(offset))
+            data[offset >> 3] |= 1 << (offset & 7)
+
+    def popcount(self, chunk_size=1024 * 1024):
+        """number of bits set, counted per byte through a lookup table"""
+        data, rt = self._data, 0
+        for i in range(0, len(data), chunk_size):
+            rt += sum(bytes(data[i:i + chunk_size]).translate(_POPCOUNT_TABLE))
+        if self.size & 7:                           # a shared buffer may have bits set beyond size
+            rt -= _POPCOUNT_TABLE[data[-1] & ~self._last_mask() & 0xFF]
+        return rt
+
+    def __iter__(self):
+        """iterates offsets of set bits in ascending order"""
+        positions, last, last_mask = _BIT_POSITIONS, len(self._data) - 1, self._last_mask()
+        for idx, byte in enumerate(self._data):
+            if idx == last:
+                byte &= last_mask
+            if byte:
+                base = idx << 3
+                for j in positions[byte]:
+                    yield base + j
+
+    def _as_int(self):
+        return int.from_bytes(bytes(self._data), 'little')
+
+    def _from_int(self, vl):
+        return Bitmap(self.size, vl.to_bytes(len(self._data), 'little'))
+
+    def _same_size(self, other):
+        if self.size != other.size:
+            raise ValueError("bitmap sizes differ ({:,d} != {:,d})".format(self.size, other.size))
+
+    def __and__(self, other):
+        self._same_size(other)
+        return self._from_int(self._as_int() & other._as_int())
+
+    def __or__(self, other):
+        self._same_size(other)
+        return self._from_int(self._as_int() | other._as_int())
+
+    def __xor__(self, other):
+        self._same_size(other)
+        return self._from_int(self._as_int() ^ other._as_int())
+
+    def andnot(self, other):
+        """bits set in self but not in other"""
+        self._same_size(other)
+        return self._from_int(self._as_int() & ~other._as_int())
+
+    __sub__ = andnot
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and self.size == other.size and self.to_bytes() == other.to_bytes()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def to_bytes(self):
+        rt = bytes(self._data)
+        if self.size & 7 and rt[-1] & ~self._last_mask() & 0xFF:
+            rt = rt[:-1] + bytes((rt[-1] & self._last_mask(),))
+        return rt
+
+    def tofile(self, file_obj):
+        """writes raw bytes to file_obj, the file can later be mapped with mmap and :meth:`from_buffer`"""
+        file_obj.write(self._data)
+
+
+def benchmark_bitmap(size=10 ** 6, density=0.01, seed=0, bit_len_bits=10 ** 5):
+    """compares :class:`Bitmap` against an int used as a bitset with :func:`bits_count`, :func:`bit_len`
+    (bit_len shifts one bit at a time, quadratic in size, so it is timed on the lowest bit_len_bits bits only)
+
+    :returns: a dictionary with seconds per operation for each approach
+    """
+    from random import Random
+    offsets = Random(seed).sample(range(size), int(size * density))
+    rt = {}
+    started = _timer()
+    int_bits = 0
+    for offset in offsets:
+        int_bits |= 1 << offset
+    rt['int_set'] = _timer() - started
+    started = _timer()
+    bm = Bitmap.from_iter(size, offsets)
+    rt['bitmap_set'] = _timer() - started
+    started = _timer()
+    int_count = bits_count(int_bits)
+    rt['int_bits_count'] = _timer() - started
+    started = _timer()
+    bm_count = bm.popcount()
+    rt['bitmap_popcount'] = _timer() - started
+    bit_len_bits = min(size, bit_len_bits)
+    low_bits = int_bits & ((1 << bit_len_bits) - 1)
+    started = _timer()
+    int_len = bit_len(low_bits)
+    rt['int_bit_len'] = _timer() - started
+    rt['int_bit_len_bits'] = bit_len_bits
+    started = _timer()
+    bm_test = sum(1 for offset in offsets if offset in bm)
+    rt['bitmap_test'] = _timer() - started
+    started = _timer()
+    int_test = sum(1 for offset in offsets if int_bits >> offset & 1)
+    rt['int_test'] = _timer() - started
+    assert int_count == bm_count == bm_test == int_test and int_len == low_bits.bit_length()
+    return rt
\ No newline at end of file
@@ -2,22 +2,342 @@
 `Olympia <https://en.wikipedia.org/wiki/Olympia,_Greece>`_ where first Olympic games were held
 """
 
+import io
+import os
+import mmap
 import zlib
 import pickle
+import struct
+from bisect import bisect_right
+from collections import OrderedDict, Counter
+from functools import partial
+from time import perf_counter as _timer
+from Hellas.Sparta import Error
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+try:
+    from multiprocessing import shared_memory           # python 3.8+
+except ImportError:
+    shared_memory = None
 
+CODEC_MAGIC = b'\x00'          # never the first byte of a zlib stream so legacy (headerless) blobs are recognized
 
-def pickle_compress(obj, print_compression_info=False):
-    """pickle and compress an object"""
-    p = pickle.dumps(obj)
-    c = zlib.compress(p)
+
+class ErrorUnknownCodec(Error):
+    pass
+
+
+class ErrorFrameFile(Error):
+    pass
+
+
+def _identity(data):
+    return data
+
+
+CODECS = {'raw': (_identity, _identity)}
+"""codec registry name: (compress function, decompress function) see :func:`register_codec`"""
+
+
+def register_codec(name, compress, decompress):
+    """registers a codec for :func:`pickle_compress`, name is stored in the header of compressed objects
+
+    :param str name: up to 255 ascii characters
+    :param function compress: bytes -> bytes
+    :param function decompress: bytes -> bytes
+    """
+    if not 0 < len(name) < 256:
+        raise ValueError("codec name must be 1 to 255 characters")
+    CODECS[name] = (compress, decompress)
+
+
+for _level in range(1, 10):
+    register_codec('zlib-{:d}'.format(_level), partial(zlib.compress, level=_level), zlib.decompress)
+register_codec('zlib', zlib.compress, zlib.decompress)
+if bz2 is not None:
+    register_codec('bz2', bz2.compress, bz2.decompress)
+if lzma is not None:
+    register_codec('lzma', lzma.compress, lzma.decompress)
+
+
+def _codec_header(name):
+    name = name.encode('ascii')
+    return CODEC_MAGIC + bytes(bytearray([len(name)])) + name
+
+
+def _codec_split(data):
+    """:returns: (codec name, payload) of a pickle_compress object, legacy objects have no header and are zlib"""
+    data = memoryview(data)
+    if data[:1] != CODEC_MAGIC:
+        return 'zlib', data
+    end = 2 + data[1]
+    return data[2:end].tobytes().decode('ascii'), data[end:]
+
+
+def _codec(name):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ErrorUnknownCodec("unknown codec {!r} (registered: {})".format(name, ", ".join(sorted(CODECS))))
+
+
+def pickle_compress(obj, print_compression_info=False, codec=None, protocol=None):
+    """pickle and compress an object
+
+    :param str codec: one of :data:`CODECS` i.e. 'zlib-1' (fast) .. 'zlib-9', 'bz2', 'lzma' (best ratio) or 'raw'
+                      (no compression, use it with protocol 5 for large binary data), when given a small header
+                      with the codec name is prepended so :func:`pickle_decompress` detects it.
+                      Defaults to None (plain zlib without header as in previous versions)
+    :param int protocol: pickle protocol, defaults to pickle's default
+
+    :Example:
+        >>> pickle_decompress(pickle_compress(list(range(10)), codec='lzma', protocol=pickle.HIGHEST_PROTOCOL))
+        [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    """
+    p = pickle.dumps(obj, protocol)
+    if codec is None:
+        c = zlib.compress(p)
+    else:
+        c = _codec_header(codec) + _codec(codec)[0](p)
     if print_compression_info:
         print ("len = {:,d} compr={:,d} ratio:{:.6f}".format(len(p), len(c), float(len(c))/len(p)))
     return c
 
 
 def pickle_decompress(obj):
-    """ decompress  a pickle_compress object"""
-    return pickle.loads(zlib.decompress(obj))
+    """ decompress  a pickle_compress object (codec is detected from its header)"""
+    codec, payload = _codec_split(obj)
+    return pickle.loads(_codec(codec)[1](payload))
+
+
+def benchmark_codecs(obj, codecs=None, protocol=pickle.HIGHEST_PROTOCOL, repeat=3):
+    """measures each codec on a sample object
+
+    :param obj: any pickle-able object (use a representative sample of your data)
+    :param list codecs: codec names, defaults to all registered codecs
+    :returns: a list of dictionaries with codec, size, ratio, compress and decompress MB/s (relative to pickled size)
+              sorted by size
+    """
+    pickled_len = len(pickle.dumps(obj, protocol))
+    rt = []
+    for codec in sorted(CODECS) if codecs is None else codecs:
+        compress_secs = decompress_secs = float('inf')
+        for i in range(repeat):
+            started = _timer()
+            c = pickle_compress(obj, codec=codec, protocol=protocol)
+            compress_secs = min(compress_secs, _timer() - started)
+            started = _timer()
+            pickle_decompress(c)
+            decompress_secs = min(decompress_secs, _timer() - started)
+        mb = pickled_len / 1048576.0
+        rt.append({'codec': codec, 'size': len(c), 'ratio': len(c) / float(pickled_len),
+                   'compress_mbs': mb / compress_secs if compress_secs else float('inf'),
+                   'decompress_mbs': mb / decompress_secs if decompress_secs else float('inf')})
+    return sorted(rt, key=lambda x: x['size'])
+
+
+def _pickle_compress_batch(objs, codec, protocol):
+    return [pickle_compress(obj, codec=codec, protocol=protocol) for obj in objs]
+
+
+def _pickle_decompress_batch(blobs):
+    return [pickle_decompress(blob) for blob in blobs]
+
+
+def _map_batches(func, items, batch_size, workers, executor, *args):
+    """runs func(batch, *args) over batches of items in a thread or process pool, yields results in input order"""
+    from concurrent import futures
+    from itertools import islice
+    pool_class = {'thread': futures.ThreadPoolExecutor, 'process': futures.ProcessPoolExecutor}[executor]
+    it = iter(items)
+    batches = iter(lambda: list(islice(it, batch_size)), [])
+    workers = workers or os.cpu_count() or 1
+    with pool_class(workers) as pool:
+        pending = []
+        for batch in batches:                   # keep at most 2 batches per worker in flight to bound memory
+            pending.append(pool.submit(func, batch, *args))
+            if len(pending) >= 2 * workers:
+                for result in pending.pop(0).result():
+                    yield result
+        for future in pending:
+            for result in future.result():
+                yield result
+
+
+def pickle_compress_many(objs, codec=None, protocol=None, batch_size=256, workers=None, executor='thread'):
+    """:func:`pickle_compress` for many objects fanned out to a pool in batches, results are in input order
+
+    zlib, bz2 and lzma release the GIL so threads scale the compression stage, pickling itself needs the GIL so for
+    objects that are expensive to pickle use executor='process' (objects are then pickled to reach the workers too)
+
+    :param iterable objs: objects to compress
+    :param int batch_size: objects per task, larger batches amortize pool overhead
+    :param int workers: pool size, defaults to number of cpus
+    :param str executor: 'thread' or 'process'
+    :returns: a list of compressed objects
+    """
+    return list(_map_batches(_pickle_compress_batch, objs, batch_size, workers, executor, codec, protocol))
+
+
+def pickle_decompress_many(blobs, batch_size=256, workers=None, executor='thread'):
+    """:func:`pickle_decompress` for many objects, see :func:`pickle_compress_many`"""
+    return list(_map_batches(_pickle_decompress_batch, blobs, batch_size, workers, executor))
+
+
+def benchmark_compress_many(objs, max_workers=None, codec='zlib-6', batch_size=256, executor='thread'):
+    """reports scaling of :func:`pickle_compress_many` and :func:`pickle_decompress_many` from 1 to max_workers
+
+    :param list objs: sample objects
+    :returns: a list of dictionaries with workers, objects per second and speedup relative to a single worker
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    rt = []
+    for workers in range(1, max_workers + 1):
+        started = _timer()
+        blobs = pickle_compress_many(objs, codec, batch_size=batch_size, workers=workers, executor=executor)
+        compress_secs = _timer() - started
+        started = _timer()
+        pickle_decompress_many(blobs, batch_size=batch_size, workers=workers, executor=executor)
+        decompress_secs = _timer() - started
+        rt.append({'workers': workers, 'compress_per_sec': len(objs) / compress_secs,
+                   'decompress_per_sec': len(objs) / decompress_secs})
+    for i in rt:
+        i['compress_speedup'] = i['compress_per_sec'] / rt[0]['compress_per_sec']
+        i['decompress_speedup'] = i['decompress_per_sec'] / rt[0]['decompress_per_sec']
+    return rt
+
+
+class ZDict(object):
+    """a preset dictionary (zlib zdict) trained from sample objects, small objects compressed against it share the
+    context of the samples so they get far better ratios than :func:`pickle_compress` on their own.
+    Compressed objects start with the 4 bytes dict_id so decompressing with a different dictionary is detected
+
+    :param bytes data: dictionary contents (up to 32 KB are used by zlib)
+    :param int level: zlib compression level 0-9 or -1 (zlib.Z_DEFAULT_COMPRESSION)
+    :param int protocol: pickle protocol
+    :param int dict_id: a version id, defaults to crc32 of data
+    :raises ValueError: on an invalid level
+
+    :Example:
+        >>> zd = ZDict.train([{'id': i, 'name': 'user {}'.format(i), 'active': True} for i in range(1000)])
+        >>> c = zd.compress({'id': 1001, 'name': 'user 1001', 'active': False})
+        >>> len(c), len(pickle_compress({'id': 1001, 'name': 'user 1001', 'active': False}))
+        (26, 57)
+        >>> zd.decompress(c)
+        {'id': 1001, 'name': 'user 1001', 'active': False}
+        >>> zd2 = ZDict.from_bytes(zd.to_bytes())      # store it along the data
+    """
+    _header = struct.Struct('<I')
+
+    def __init__(self, data, level=6, protocol=pickle.HIGHEST_PROTOCOL, dict_id=None):
+        if not -1 <= level <= 9:
+            raise ValueError("invalid compression level {}".format(level))
+        self.data = bytes(data[-32768:])
+        self.level = level
+        self.protocol = protocol
+        self.dict_id = (zlib.crc32(self.data) & 0xffffffff) if dict_id is None else dict_id
+        self._prefix = self._header.pack(self.dict_id)
+
+    def __repr__(self):
+        return "<ZDict: id={:08x} size={:,d} level={:d}>".format(self.dict_id, len(self.data), self.level)
+
+    @classmethod
+    def train(cls, samples, size=32768, level=6, protocol=pickle.HIGHEST_PROTOCOL, dict_id=None, k=8):
+        """builds a dictionary from the most representative samples
+
+        each distinct pickled sample is scored by how many other samples share its k byte substrings on average,
+        samples are concatenated with best scored last (zlib reaches the end of the dictionary more cheaply)
+
+        :param iterable samples: sample objects similar to the ones to be compressed
+        :param int size: maximum dictionary size in bytes (32 KB max useful for zlib)
+        """
+        pickled = list(OrderedDict.fromkeys(pickle.dumps(i, protocol) for i in samples))
+        frequency = Counter()
+        grams = []
+        for p in pickled:
+            p_grams = set(p[i:i + k] for i in range(max(len(p) - k + 1, 1)))
+            frequency.update(p_grams)
+            grams.append(p_grams)
+        scored = sorted(zip([sum(frequency[g] for g in p_grams) / float(len(p_grams)) for p_grams in grams], pickled))
+        data, total = [], 0
+        for score, p in reversed(scored):
+            if total + len(p) > size:
+                break
+            data.append(p)
+            total += len(p)
+        return cls(b''.join(reversed(data)), level, protocol, dict_id)
+
+    def to_bytes(self):
+        """serialized dictionary including dict_id, level and protocol (see :meth:`from_bytes`)"""
+        return struct.pack('<IbB', self.dict_id, self.level, self.protocol) + self.data
+
+    @classmethod
+    def from_bytes(cls, data):
+        dict_id, level, protocol = struct.unpack_from('<IbB', data)
+        return cls(data[6:], level, protocol, dict_id)
+
+    def compress_bytes(self, data):
+        co = zlib.compressobj(self.level, zlib.DEFLATED, -15, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, self.data)
+        return self._prefix + co.compress(data) + co.flush()
+
+    def decompress_bytes(self, data):
+        if data[:4] != self._prefix:
+            raise ErrorUnknownCodec("object was compressed with dictionary {:08x} not {:08x}".format(
+                self._header.unpack_from(data)[0], self.dict_id))
+        do = zlib.decompressobj(-15, self.data)
+        return do.decompress(data[4:]) + do.flush()
+
+    def compress(self, obj):
+        """pickles and compresses obj against the dictionary"""
+        return self.compress_bytes(pickle.dumps(obj, self.protocol))
+
+    def decompress(self, data):
+        return pickle.loads(self.decompress_bytes(data))
+
+    @property
+    def codec_name(self):
+        return 'zdict-{:08x}'.format(self.dict_id)
+
+    def register(self):
+        """registers the dictionary as codec :attr:`codec_name` so it can be used with :func:`pickle_compress`"""
+        register_codec(self.codec_name, self.compress_bytes, self.decompress_bytes)
+        return self.codec_name
+
+
+def benchmark_zdict(samples, zdict=None, train_fraction=0.2):
+    """compares :class:`ZDict` with :func:`pickle_compress` on the same samples
+
+    :param list samples: sample objects, if zdict is None the first train_fraction of them is used for training
+                         and the rest for measuring
+    :returns: a dictionary with total sizes, ratios and objects per second for compress and decompress
+    """
+    samples = list(samples)
+    if zdict is None:
+        split = max(1, int(len(samples) * train_fraction))
+        zdict, samples = ZDict.train(samples[:split]), samples[split:]
+    raw_len = sum(len(pickle.dumps(i, zdict.protocol)) for i in samples)
+    rt = {'objects': len(samples), 'raw_size': raw_len}
+    for name, compress, decompress in (('plain', pickle_compress, pickle_decompress),
+                                       ('zdict', zdict.compress, zdict.decompress)):
+        started = _timer()
+        blobs = [compress(i) for i in samples]
+        compress_secs = _timer() - started
+        started = _timer()
+        for i in blobs:
+            decompress(i)
+        decompress_secs = _timer() - started
+        size = sum(len(i) for i in blobs)
+        rt[name + '_size'] = size
+        rt[name + '_ratio'] = size / float(raw_len)
+        rt[name + '_compress_per_sec'] = len(samples) / compress_secs if compress_secs else float('inf')
+        rt[name + '_decompress_per_sec'] = len(samples) / decompress_secs if decompress_secs else float('inf')
+    return rt
 
 
 def pickle_compress_test(obj, print_compression_ratio=True):
@@ -38,3 +358,625 @@ def pickle_decompress_str(obj):
     .. Warning:: it uses 'eval' use it carefully
     """
     return eval(pickle_decompress_str(obj))
+
+
+# framed files ------------------------------------------------------------------------------------------------------
+#   header: FRAME_MAGIC | version (1 byte) | codec name length (1 byte) | codec name
+#   frames: compressed length (uint32) | records count (uint32) | compressed concatenated pickles
+#   footer: pickled index [(offset, first_record, records_count), ...] | index offset (uint64) | FRAME_FOOTER_MAGIC
+FRAME_MAGIC = b'HLFRAMES'
+FRAME_FOOTER_MAGIC = b'HLINDEX0'
+_FRAME_VERSION = 1
+_FRAME_HEAD = struct.Struct('<II')
+_FRAME_TRAILER = struct.Struct('<Q8s')
+
+
+class PickleFrameWriter(object):
+    """writes records (any pickle-able objects) to a file in independently compressed frames of about chunk_size
+    bytes of pickled data, followed by an index of frames, memory is bounded by chunk_size regardless of data size
+
+    :param path_or_file: a file path or a binary file like object opened for writing
+    :param int chunk_size: uncompressed bytes per frame
+    :param str codec: any codec in :data:`CODECS`
+    :param int protocol: pickle protocol
+
+    :Example:
+        >>> with PickleFrameWriter('/tmp/records.hlf') as wr:
+        >>>     wr.write_many({'id': i} for i in range(1000000))
+        >>> rd = PickleFrameReader('/tmp/records.hlf')
+        >>> len(rd), next(iter(rd)), rd[999999]
+        (1000000, {'id': 0}, {'id': 999999})
+    """
+    def __init__(self, path_or_file, chunk_size=4 * 1024 * 1024, codec='zlib-6', protocol=pickle.HIGHEST_PROTOCOL):
+        self._compress = _codec(codec)[0]
+        self._own_file = not hasattr(path_or_file, 'write')
+        self._file = open(path_or_file, 'wb') if self._own_file else path_or_file
+        self.chunk_size = chunk_size
+        self.protocol = protocol
+        self.records_count = 0
+        self._index = []
+        self._buffer = io.BytesIO()
+        self._pickler = None
+        self._buffered = 0
+        self._new_pickler()
+        codec = codec.encode('ascii')
+        self._file.write(FRAME_MAGIC + bytes(bytearray([_FRAME_VERSION, len(codec)])) + codec)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _new_pickler(self):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._pickler = pickle.Pickler(self._buffer, self.protocol)
+        self._buffered = 0
+
+    def write(self, record):
+        self._pickler.dump(record)
+        self._pickler.clear_memo()          # records are independent (also safe for records mutated between writes)
+        self._buffered += 1
+        if self._buffer.tell() >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """compresses buffered records to a frame"""
+        if not self._buffered:
+            return
+        data = self._compress(self._buffer.getvalue())
+        self._index.append((self._file.tell(), self.records_count, self._buffered))
+        self._file.write(_FRAME_HEAD.pack(len(data), self._buffered))
+        self._file.write(data)
+        self.records_count += self._buffered
+        self._new_pickler()
+
+    def close(self):
+        """flushes and writes the frames index, file can't be written after that"""
+        if self._file is None:
+            return
+        self.flush()
+        index_offset = self._file.tell()
+        self._file.write(pickle.dumps(self._index, 2))
+        self._file.write(_FRAME_TRAILER.pack(index_offset, FRAME_FOOTER_MAGIC))
+        if self._own_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+
+class PickleFrameReader(object):
+    """reads files written by :class:`PickleFrameWriter` lazily, one frame in memory at a time,
+    if the index is missing (writer not closed) frames are located by scanning frame headers
+
+    :param path_or_file: a file path or a seekable binary file like object
+    """
+    def __init__(self, path_or_file):
+        self._own_file = not hasattr(path_or_file, 'read')
+        self._file = open(path_or_file, 'rb') if self._own_file else path_or_file
+        self._file.seek(0)
+        head = self._file.read(len(FRAME_MAGIC) + 2)
+        if len(head) < len(FRAME_MAGIC) + 2 or not head.startswith(FRAME_MAGIC):
+            raise ErrorFrameFile("not a frame file")
+        if bytearray(head)[-2] != _FRAME_VERSION:
+            raise ErrorFrameFile("unsupported frame file version {:d}".format(bytearray(head)[-2]))
+        self.codec = self._file.read(bytearray(head)[-1]).decode('ascii')
+        self._decompress = _codec(self.codec)[1]
+        self._data_start = self._file.tell()
+        self._index = self._read_index()
+        self._firsts = [i[1] for i in self._index]
+        self.records_count = self._index[-1][1] + self._index[-1][2] if self._index else 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<PickleFrameReader: codec={} frames={:,d} records={:,d}>".format(self.codec, len(self._index), self.records_count)
+
+    def _read_index(self):
+        fl = self._file
+        fl.seek(0, 2)
+        end = fl.tell()
+        if end - self._data_start >= _FRAME_TRAILER.size:
+            fl.seek(end - _FRAME_TRAILER.size)
+            index_offset, magic = _FRAME_TRAILER.unpack(fl.read(_FRAME_TRAILER.size))
+            if magic == FRAME_FOOTER_MAGIC:
+                fl.seek(index_offset)
+                return pickle.loads(fl.read(end - _FRAME_TRAILER.size - index_offset))
+        index, offset, first = [], self._data_start, 0          # no footer, scan frame headers
+        while offset + _FRAME_HEAD.size <= end:
+            fl.seek(offset)
+            length, count = _FRAME_HEAD.unpack(fl.read(_FRAME_HEAD.size))
+            if offset + _FRAME_HEAD.size + length > end:
+                break                                           # truncated last frame
+            index.append((offset, first, count))
+            offset += _FRAME_HEAD.size + length
+            first += count
+        return index
+
+    def __len__(self):
+        return self.records_count
+
+    @property
+    def frames_count(self):
+        return len(self._index)
+
+    def frame(self, frame_number):
+        """:returns: a list with the records of a frame"""
+        offset, first, count = self._index[frame_number]
+        self._file.seek(offset)
+        length = _FRAME_HEAD.unpack(self._file.read(_FRAME_HEAD.size))[0]
+        unpickler = pickle.Unpickler(io.BytesIO(self._decompress(self._file.read(length))))
+        return [unpickler.load() for i in range(count)]
+
+    def iter_from(self, record_number=0):
+        """iterates records lazily starting from record_number (seeks directly to its frame)"""
+        if record_number >= self.records_count:
+            return
+        frame_number = bisect_right(self._firsts, record_number) - 1
+        skip = record_number - self._firsts[frame_number]
+        for i in range(frame_number, len(self._index)):
+            records = self.frame(i)
+            for record in records[skip:] if skip else records:
+                yield record
+            skip = 0
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def __getitem__(self, record_number):
+        if record_number < 0:
+            record_number += self.records_count
+        if not 0 <= record_number < self.records_count:
+            raise IndexError("record number out of range")
+        frame_number = bisect_right(self._firsts, record_number) - 1
+        return self.frame(frame_number)[record_number - self._firsts[frame_number]]
+
+    def close(self):
+        if self._own_file and self._file is not None:
+            self._file.close()
+        self._file = None
+
+
+# object store -------------------------------------------------------------------------------------------------------
+#   data file entries: flags (1 byte) | key length (uint32) | value length (uint32) | key | pickle_compress(value)
+#   index file: pickled (data file size covered, {key: (value offset, value length)}) written on flush/close
+_STORE_ENTRY = struct.Struct('<BII')
+_STORE_PUT, _STORE_STR_KEY = 1, 2
+
+
+class ObjectStore(object):
+    """disk backed key/value store of :func:`pickle_compress` objects in an append only data file with a hash index.
+    Reads go through mmap so many processes share the OS page cache instead of holding their own copies,
+    an optional in process LRU keeps recently decoded objects. One writer, many readers (readers call :meth:`refresh`
+    to see new entries, a reader also notices a data file replaced by :meth:`compact` and reloads it)
+
+    :param str path: base path, files path.data and path.index are used
+    :param bool readonly: open for reading only
+    :param int cache_size: number of decoded objects to keep in an LRU cache (0 disables it)
+    :param str codec: see :func:`pickle_compress`
+
+    :Example:
+        >>> with ObjectStore('/tmp/objects') as st:
+        >>>     st['foo'] = {'bar': 1}
+        >>>     st.put_many((str(i), i) for i in range(1000))
+        >>> ObjectStore('/tmp/objects', readonly=True, cache_size=100).get_many(['foo', '999'])
+        [{'bar': 1}, 999]
+    """
+    def __init__(self, path, readonly=False, cache_size=0, codec='zlib-6', protocol=pickle.HIGHEST_PROTOCOL):
+        self.path = path
+        self.readonly = readonly
+        self.codec = codec
+        self.protocol = protocol
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._mode = 'rb' if readonly else 'ab+'
+        self._file = open(path + '.data', self._mode)
+        self._mmap = None
+        self._index, self._indexed_size = self._load_index()
+        self.refresh()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<ObjectStore: {} keys={:,d} size={:,d}>".format(self.path, len(self._index), self._indexed_size)
+
+    def _load_index(self):
+        try:
+            with open(self.path + '.index', 'rb') as fin:
+                size, index = pickle.load(fin)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return {}, 0
+        if size > os.fstat(self._file.fileno()).st_size:        # stale index (data file replaced or truncated)
+            return {}, 0
+        return index, size
+
+    def _save_index(self):
+        tmp = self.path + '.index.tmp'
+        with open(tmp, 'wb') as fout:
+            pickle.dump((self._indexed_size, self._index), fout, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path + '.index')              # rename fails on windows if target exists
+
+    def _remap(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if self._mmap is not None:
+            if len(self._mmap) == size:
+                return
+            self._mmap.close()
+            self._mmap = None
+        if size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _reopen_if_replaced(self):
+        """reopens data file if it was replaced (i.e. compacted by another process), index is rebuilt by scanning"""
+        try:
+            ino = os.stat(self.path + '.data').st_ino
+        except (IOError, OSError):
+            return
+        if ino == os.fstat(self._file.fileno()).st_ino:
+            return
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        self._file = open(self.path + '.data', self._mode)
+        self._index, self._indexed_size = {}, 0
+        self._cache.clear()
+
+    def refresh(self):
+        """indexes entries appended to data file after the last indexed position (i.e. by another process)"""
+        if not self.readonly:
+            self._file.flush()
+        self._reopen_if_replaced()
+        self._remap()
+        mm, offset, index, cache = self._mmap, self._indexed_size, self._index, self._cache
+        end = len(mm) if mm is not None else 0
+        while offset + _STORE_ENTRY.size <= end:
+            flags, key_len, value_len = _STORE_ENTRY.unpack_from(mm, offset)
+            value_offset = offset + _STORE_ENTRY.size + key_len
+            if value_offset + value_len > end:
+                break                                           # partially written entry
+            key = mm[offset + _STORE_ENTRY.size:value_offset]
+            if flags & _STORE_STR_KEY:
+                key = key.decode('utf8')
+            if flags & _STORE_PUT:
+                index[key] = (value_offset, value_len)
+            else:
+                index.pop(key, None)
+            cache.pop(key, None)
+            offset = value_offset + value_len
+        self._indexed_size = offset
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(list(self._index))
+
+    keys = __iter__
+
+    def _append(self, key, value_bytes, flags):
+        if self.readonly:
+            raise IOError("store is open read only")
+        if isinstance(key, bytes):
+            key_bytes = key
+        else:
+            key_bytes, flags = key.encode('utf8'), flags | _STORE_STR_KEY
+        header = _STORE_ENTRY.pack(flags, len(key_bytes), len(value_bytes)) + key_bytes
+        offset = self._file.tell()
+        self._file.write(header)
+        self._file.write(value_bytes)
+        if offset == self._indexed_size:        # index is up to date so we index our own entry (mmap is remapped on read)
+            if flags & _STORE_PUT:
+                self._index[key] = (offset + len(header), len(value_bytes))
+            else:
+                self._index.pop(key, None)
+            self._indexed_size = offset + len(header) + len(value_bytes)
+        self._cache.pop(key, None)
+
+    def put(self, key, obj):
+        """stores obj under key (a str or bytes)"""
+        self.put_many(((key, obj),))
+
+    __setitem__ = put
+
+    def put_many(self, items):
+        """stores an iterable of (key, obj) tuples, data file is flushed once at the end so readers can see them"""
+        for key, obj in items:
+            self._append(key, pickle_compress(obj, codec=self.codec, protocol=self.protocol), _STORE_PUT)
+        self._file.flush()
+
+    def delete(self, key):
+        if key not in self._index:
+            raise KeyError(key)
+        self._append(key, b'', 0)
+        self._file.flush()
+
+    __delitem__ = delete
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key):
+        cache = self._cache
+        if key in cache:
+            obj = cache.pop(key)
+            cache[key] = obj                    # most recently used goes last
+            return obj
+        offset, length = self._index[key]
+        mm = self._mmap
+        if mm is None or offset + length > len(mm):     # written after last mapping
+            if not self.readonly:
+                self._file.flush()
+            self._remap()
+            mm = self._mmap
+        obj = pickle_decompress(mm[offset:offset + length])
+        if self.cache_size:
+            cache[key] = obj
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return obj
+
+    def get_many(self, keys):
+        """:returns: a list of objects for keys (raises KeyError for missing keys)"""
+        return [self[key] for key in keys]
+
+    def compact(self):
+        """rewrites data file keeping only live entries (reclaims space of overwritten and deleted keys)"""
+        if self.readonly:
+            raise IOError("store is open read only")
+        self.refresh()
+        tmp = self.path + '.data.tmp'
+        index = {}
+        with open(tmp, 'wb') as fout:
+            for key, (offset, length) in self._index.items():
+                key_bytes, flags = (key, _STORE_PUT) if isinstance(key, bytes) else (key.encode('utf8'), _STORE_PUT | _STORE_STR_KEY)
+                fout.write(_STORE_ENTRY.pack(flags, len(key_bytes), length) + key_bytes)
+                index[key] = (fout.tell(), length)
+                fout.write(self._mmap[offset:offset + length])
+            size = fout.tell()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        os.replace(tmp, self.path + '.data')
+        self._file = open(self.path + '.data', 'ab+')
+        self._index, self._indexed_size = index, size
+        self._save_index()
+        self._remap()
+
+    def flush(self):
+        """flushes data file and saves index so next open doesn't need to scan the data file"""
+        if not self.readonly:
+            self.refresh()
+            self._save_index()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+        self._file = self._mmap = None
+
+
+def benchmark_store(path, count=100000, gets=200000, cache_size=0, seed=0):
+    """gets per second of an :class:`ObjectStore` against a dict of :func:`pickle_compress` blobs in memory
+
+    :param str path: base path for a temporary store (files are removed at the end)
+    :returns: a dictionary with gets per second for each approach
+    """
+    from random import Random
+    rnd = Random(seed)
+    items = [('key{:d}'.format(i), {'id': i, 'name': 'name {:d}'.format(i), 'tags': list(range(i % 10))})
+             for i in range(count)]
+    keys = [items[rnd.randrange(count)][0] for i in range(gets)]
+    blobs = dict((key, pickle_compress(obj)) for key, obj in items)
+    started = _timer()
+    for key in keys:
+        pickle_decompress(blobs[key])
+    dict_secs = _timer() - started
+    try:
+        with ObjectStore(path, cache_size=cache_size) as store:
+            store.put_many(items)
+            started = _timer()
+            for key in keys:
+                store[key]
+            store_secs = _timer() - started
+    finally:
+        for ext in ('.data', '.index'):
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+    return {'dict_gets_per_sec': gets / dict_secs, 'store_gets_per_sec': gets / store_secs}
+
+
+# shared memory transfer ---------------------------------------------------------------------------------------------
+_SHM_ALIGN = 64
+_SHM_PUBLISHED = set()              # names of blocks created by this process (tracked by its resource tracker)
+
+
+def _shm_required():
+    if shared_memory is None:
+        raise Error("SharedObject requires python 3.8+ (multiprocessing.shared_memory)")
+
+
+def _shm_attach(name):
+    """attaches to an existing shared memory block without registering it to this process's resource tracker
+    (which would otherwise unlink it when the consumer exits)
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)             # python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name)
+        if name in _SHM_PUBLISHED:
+            return shm
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except (ImportError, AttributeError, KeyError):
+            pass
+        return shm
+
+
+class SharedObject(object):
+    """zero copy transfer of large objects between processes through pickle protocol 5 out of band buffers placed
+    in a ``multiprocessing.shared_memory`` block. numpy arrays and ``pickle.PickleBuffer`` objects are copied once
+    by the producer and mapped by consumers without copying (a PickleBuffer loads as a memoryview), a bytearray
+    is out of band as well but is copied again by its constructor on load, anything else is in the pickle stream
+    (i.e. bytes are always in band)
+
+    lifetime:
+        - producer :meth:`publish` creates the block and sends :attr:`descriptor` (a small picklable tuple) to consumers
+        - consumers :meth:`attach` the descriptor, :meth:`load` returns objects backed by the shared memory so keep the
+          SharedObject open while they are used, :meth:`close` releases the mapping
+        - producer calls :meth:`unlink` (or uses it as a context manager) when consumers have attached,
+          memory is freed when the last process closes it
+
+    :Example:
+        >>> with SharedObject.publish({'data': numpy.zeros(10 ** 8)}) as shared:      # producer
+        >>>     queue.put(shared.descriptor)
+        >>>     done_event.wait()
+        >>> with SharedObject.attach(queue.get()) as shared:                           # consumer
+        >>>     obj = shared.load()
+        >>>     obj['data'].sum()
+    """
+    def __init__(self, shm, descriptor, owner):
+        self._shm = shm
+        self._owner_shm = shm if owner else None    # kept after close, unlink only needs its name
+        self.descriptor = descriptor
+        self.owner = owner
+        self._unlinked = False
+
+    def __repr__(self):
+        return "<SharedObject: {} size={:,d} buffers={:d} owner={}>".format(
+            self.descriptor[0], self._shm.size if self._shm else 0, len(self.descriptor[2]), self.owner)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owner:
+            self.unlink()
+        self.close()
+
+    @classmethod
+    def publish(cls, obj, name=None):
+        """pickles obj (protocol 5) into a new shared memory block
+
+        :returns: a SharedObject owned by this process
+        :raises Error: on python < 3.8
+        """
+        _shm_required()
+        buffers = []
+
+        def buffer_callback(pickle_buffer):
+            try:
+                buffers.append(pickle_buffer.raw())
+            except BufferError:                     # not contiguous, keep it in band
+                return True
+            return False
+
+        data = pickle.dumps(obj, 5, buffer_callback=buffer_callback)
+        layout, offset = [], len(data)
+        for buf in buffers:
+            offset = (offset + _SHM_ALIGN - 1) // _SHM_ALIGN * _SHM_ALIGN
+            layout.append((offset, buf.nbytes))
+            offset += buf.nbytes
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, 1))
+        _SHM_PUBLISHED.add(shm.name)
+        shm.buf[:len(data)] = data
+        for (start, length), buf in zip(layout, buffers):
+            shm.buf[start:start + length] = buf
+        return cls(shm, (shm.name, len(data), tuple(layout)), True)
+
+    @classmethod
+    def attach(cls, descriptor):
+        """attaches to a block published by another process
+
+        :raises Error: on python < 3.8
+        """
+        _shm_required()
+        return cls(_shm_attach(descriptor[0]), tuple(descriptor), False)
+
+    def load(self):
+        """:returns: the object, its out of band buffers are views of the shared memory (no copy)"""
+        name, data_len, layout = self.descriptor
+        buf = self._shm.buf
+        return pickle.loads(buf[:data_len], buffers=[buf[start:start + length] for start, length in layout])
+
+    def close(self):
+        """releases this process's mapping, if loaded objects still reference the memory the mapping is left to
+        be released when they are garbage collected
+        """
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            return
+        self._shm = None
+
+    def unlink(self):
+        """removes the block name (owner only), memory is freed after every process has closed it"""
+        if not self.owner or self._unlinked:
+            return
+        self._unlinked = True
+        try:
+            self._owner_shm.unlink()                # also unregisters it from this process's resource tracker
+        except (IOError, OSError):
+            pass
+        _SHM_PUBLISHED.discard(self.descriptor[0])
+
+
+def benchmark_shared_object(sizes_mb=(10, 100), codec=None):
+    """compares :class:`SharedObject` publish + attach + load with :func:`pickle_compress` + :func:`pickle_decompress`
+    for a numpy array payload (a PickleBuffer over a bytearray if numpy is not installed) of each size in MegaBytes
+
+    :returns: a list of dictionaries with seconds for each approach per size
+    :raises Error: on python < 3.8
+    """
+    _shm_required()
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    rt = []
+    for size_mb in sizes_mb:
+        size = int(size_mb * 1024 * 1024)
+        if np is not None:
+            payload = {'array': np.arange(size // 8, dtype=np.float64)}
+        else:
+            payload = {'array': pickle.PickleBuffer(bytearray(os.urandom(size)))}
+        started = _timer()
+        pickle_decompress(pickle_compress(payload, codec=codec, protocol=pickle.HIGHEST_PROTOCOL))
+        compress_secs = _timer() - started
+        started = _timer()
+        with SharedObject.publish(payload) as producer:
+            consumer = SharedObject.attach(producer.descriptor)
+            obj = consumer.load()
+            shm_secs = _timer() - started
+            del obj
+            consumer.close()
+        rt.append({'size_mb': size_mb, 'pickle_compress_secs': compress_secs, 'shared_object_secs': shm_secs,
+                   'speedup': compress_secs / shm_secs})
+    return rt
@@ -5,15 +5,35 @@ the ancient city of `Pella <https://en.wikipedia.org/wiki/Pella>`_
 from copy import copy
 import signal
 import os
+import math
+import heapq
+import mmap
+import time
+import threading
+import weakref
+import zlib
+from array import array
 from base64 import b64encode
-from random import random
+from itertools import islice, product
+from random import random, Random
+from Hellas._compat import np, _timer   # np is None without numpy, Base62.encode_many falls back to pure python
 from Hellas.Sparta import Error
+from Hellas.Thebes import TableRenderer
+
+
+MB = 1024 * 1024
+B64_CHUNK_SIZE = 3 * 256 * 1024         # 768 KBytes in, 1 MByte of base64 out
 
 
 class ErrorFileTooBig(Error):
     pass
 
 
+class ErrorIdNode(Error):
+    """raised by :class:`IdGenerator` when its node may be shared with another process"""
+    pass
+
+
 # file operations -------------------------------------------------------------
 def read_file(path, mode='rb'):
     """
@@ -24,27 +44,134 @@ def read_file(path, mode='rb'):
         return fin.read()
 
 
+def _size_check(size, max_mb):
+    if max_mb and size > max_mb * MB:
+        raise ErrorFileTooBig("File is too big ({:.2f} MBytes)".format(size / float(MB)))
+
+
+def _file_obj_size(file_obj):
+    """returns the number of bytes left to read from a file like object or None if it can't tell without reading it"""
+    try:
+        return os.fstat(file_obj.fileno()).st_size - file_obj.tell()
+    except (AttributeError, IOError, OSError, ValueError):
+        pass
+    try:
+        pos = file_obj.tell()
+        end = file_obj.seek(0, 2)
+        file_obj.seek(pos)
+        return end - pos
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
 def file_to_base64(path_or_obj, max_mb=None):
     """converts contents of a file to base64 encoding
 
     :param str_or_object path_or_obj: fool pathname string for a file or a file like object that supports read
     :param int max_mb: maximum number in MegaBytes to accept
-    :param float lon2: longitude of second place (decimal degrees)
 
     :raises ErrorFileTooBig: if file contents > max_mb (see :class:`ErrorFileTooBig`)
     :raises IOError: if file path can't be found (Also possible other exceptions depending on file_object)
+
+    .. Note:: size is checked before reading whenever it can be known (stat or seek)
+       for big files prefer :func:`file_to_base64_iter` or :func:`file_to_base64_stream`
     """
     if not hasattr(path_or_obj, 'read'):
+        _size_check(os.stat(path_or_obj).st_size, max_mb)
         rt = read_file(path_or_obj)
     else:
+        size = _file_obj_size(path_or_obj)
+        if size is not None:
+            _size_check(size, max_mb)
         rt = path_or_obj.read()
-    if max_mb:
-        len_mb = len(rt) / (10024.0 * 1000)
-        if len_mb > max_mb:
-            raise ErrorFileTooBig("File is too big ({.2f} MBytes)" (len_mb))
+    _size_check(len(rt), max_mb)
     return b64encode(rt)
 
 
+def _b64_iter_path(path, chunk_size, max_mb=None):
+    with open(path, 'rb') as fin:
+        mm = None
+        if os.fstat(fin.fileno()).st_size:
+            try:
+                mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):           # pipes, devices, some virtual files can't be mapped
+                pass
+        if mm is None:                              # empty or unmappable (i.e. /proc files report size 0), read it
+            for chunk in _b64_iter_obj(fin, chunk_size, max_mb):
+                yield chunk
+            return
+        view = memoryview(mm)
+        try:
+            for pos in range(0, len(view), chunk_size):
+                yield b64encode(view[pos:pos + chunk_size])
+        finally:
+            view.release()
+            mm.close()
+
+
+def _b64_iter_obj(file_obj, chunk_size, max_mb=None):
+    pending, total = b'', 0
+    while True:
+        data = file_obj.read(chunk_size)
+        if not data:
+            break
+        total += len(data)
+        _size_check(total, max_mb)
+        if pending:
+            data = pending + data
+        cut = len(data) - len(data) % 3             # short reads (pipes, sockets) must not break 3 byte groups
+        pending = data[cut:]
+        if cut:
+            yield b64encode(data[:cut])
+    if pending:
+        yield b64encode(pending)
+
+
+def file_to_base64_iter(path_or_obj, max_mb=None, chunk_size=B64_CHUNK_SIZE):
+    """a generator of base64 encoded chunks of a file, memory used is independent of file size
+    (concatenated chunks are identical to :func:`file_to_base64` output)
+
+    :param str_or_object path_or_obj: fool pathname string for a file or a file like object that supports read
+    :param int max_mb: maximum number in MegaBytes to accept
+    :param int chunk_size: bytes to encode per chunk, rounded down to a multiple of 3
+        so that no chunk but the last one is padded
+
+    :raises ErrorFileTooBig: if file contents > max_mb, raised on call when size can be known (stat or seek)
+        otherwise as soon as that many bytes have been read
+    :raises IOError: if file path can't be found
+
+    :Example:
+        >>> with open('/tmp/out.b64', 'wb') as fout:
+        >>>     for chunk in file_to_base64_iter('/tmp/big.iso', max_mb=4096):
+        >>>         fout.write(chunk)
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    if not hasattr(path_or_obj, 'read'):
+        _size_check(os.stat(path_or_obj).st_size, max_mb)
+        return _b64_iter_path(path_or_obj, chunk_size, max_mb)
+    size = _file_obj_size(path_or_obj)
+    if size is not None:
+        _size_check(size, max_mb)
+    return _b64_iter_obj(path_or_obj, chunk_size, max_mb)
+
+
+def file_to_base64_stream(path_or_obj, sink, max_mb=None, chunk_size=B64_CHUNK_SIZE):
+    """writes base64 encoding of a file to sink chunk by chunk (see :func:`file_to_base64_iter`)
+
+    :param str_or_object path_or_obj: fool pathname string for a file or a file like object that supports read
+    :param object sink: any object with a write method (file, socket.makefile etc) or a callable
+    :param int max_mb: maximum number in MegaBytes to accept
+    :param int chunk_size: bytes to encode per chunk
+    :returns: number of base64 bytes written
+    """
+    write = getattr(sink, 'write', sink)
+    written = 0
+    for chunk in file_to_base64_iter(path_or_obj, max_mb, chunk_size):
+        write(chunk)
+        written += len(chunk)
+    return written
+
+
 # dictionary operations -------------------------------------------------------
 def dict_copy(a_dict, exclude_keys_lst=[], exclude_values_lst=[]):
     """a **SALLOW** copy of a dict that excludes items in exclude_keys_lst and exclude_values_lst
@@ -65,34 +192,250 @@ def dict_clip(a_dict, inlude_keys_lst=[]):
     return dict([[i[0], i[1]] for i in list(a_dict.items()) if i[0] in inlude_keys_lst])
 
 
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _hashable_only(values):
+    return frozenset(i for i in values if _hashable(i))
+
+
+class DictProjector(object):
+    """a compiled equivalent of :func:`dict_copy` / :func:`dict_clip` for applying the same projection to many dicts
+    key and value lists are turned to frozensets once so cost per record is O(keys)
+
+    :param list include_keys: if not None keep only those keys (as :func:`dict_clip`)
+    :param list exclude_keys: keys to exclude (as :func:`dict_copy`)
+    :param list exclude_values: values to exclude (as :func:`dict_copy`), unhashable values are compared by equality
+
+    :Example:
+        >>> projector = DictProjector(exclude_keys=['self'], exclude_values=[None])
+        >>> projector({'self': 1, 'a': 2, 'b': None})
+        {'a': 2}
+        >>> list(projector.project_many([{'a': 1}, {'self': 2, 'c': 3}]))
+        [{'a': 1}, {'c': 3}]
+    """
+    def __init__(self, include_keys=None, exclude_keys=(), exclude_values=()):
+        self.include_keys = None if include_keys is None else _hashable_only(include_keys)
+        self.exclude_keys = _hashable_only(exclude_keys)
+        self.exclude_values = _hashable_only(exclude_values)
+        self._exclude_values_lst = list(exclude_values)
+        if self.include_keys is not None and self.exclude_keys:
+            self.include_keys = self.include_keys - self.exclude_keys
+        self._project = self._compile()
+
+    def __repr__(self):
+        return "<{}: include:{} exclude:{} values:{}>".format(
+            self.__class__.__name__, self.include_keys, self.exclude_keys, self._exclude_values_lst)
+
+    def _compile(self):
+        keys, values = self.include_keys, self.exclude_values
+        if not all(map(_hashable, self._exclude_values_lst)):
+            return self._project_slow
+        if keys is not None:
+            if values:
+                return lambda a_dict: {k: v for k, v in a_dict.items() if k in keys and v not in values}
+            return lambda a_dict: {k: v for k, v in a_dict.items() if k in keys}
+        keys = self.exclude_keys
+        if values:
+            return lambda a_dict: {k: v for k, v in a_dict.items() if k not in keys and v not in values}
+        if keys:
+            return lambda a_dict: {k: v for k, v in a_dict.items() if k not in keys}
+        return dict
+
+    def _project_slow(self, a_dict):
+        """used for dicts with unhashable values (lists, dicts) when excluding values"""
+        keys, values = self.include_keys, self._exclude_values_lst
+        return dict([i for i in a_dict.items() if (keys is None or i[0] in keys) and
+                     i[0] not in self.exclude_keys and i[1] not in values])
+
+    def __call__(self, a_dict):
+        """:returns: a new projected dict"""
+        try:
+            return self._project(a_dict)
+        except TypeError:
+            if not self._exclude_values_lst:
+                raise
+            return self._project_slow(a_dict)
+
+    def project_many(self, iterable):
+        """a generator of projected dicts from an iterable of dicts (i.e. a stream of json records)"""
+        project = self._project
+        for a_dict in iterable:
+            try:
+                yield project(a_dict)
+            except TypeError:
+                if not self._exclude_values_lst:
+                    raise
+                yield self._project_slow(a_dict)
+
+
+def benchmark_projector(records=10 ** 5, keys=30, exclude=10, seed=0):
+    """compares per record latency of :func:`dict_copy` and :func:`dict_clip` with :class:`DictProjector`
+
+    :param int records: number of dicts
+    :param int keys: keys per dict
+    :param int exclude: number of keys (and values) to exclude or include
+    :returns: a dictionary with seconds and micro seconds per record for each approach
+    """
+    rnd = Random(seed)
+    data = [dict(('key_{:d}'.format(k), rnd.choice((None, 0, k, 'val'))) for k in range(keys)) for i in range(records)]
+    key_lst = ['key_{:d}'.format(k) for k in range(0, keys, max(1, keys // exclude))][:exclude]
+    value_lst = [None, 'no_such_value']
+    rt = {}
+    for name, func, projector in (
+            ('dict_copy', lambda d: dict_copy(d, key_lst, value_lst), DictProjector(exclude_keys=key_lst, exclude_values=value_lst)),
+            ('dict_clip', lambda d: dict_clip(d, key_lst), DictProjector(include_keys=key_lst))):
+        started = _timer()
+        expected = [func(d) for d in data]
+        secs = _timer() - started
+        started = _timer()
+        result = list(projector.project_many(data))
+        projector_secs = _timer() - started
+        assert result == expected
+        rt[name + '_secs'], rt[name + '_usec_per_record'] = secs, secs * 10 ** 6 / records
+        rt[name + '_projector_secs'], rt[name + '_projector_usec_per_record'] = projector_secs, projector_secs * 10 ** 6 / records
+    return rt
+
+
 # list operations -------------------------------------------------------------
 def list_randomize(lst):
     """returns list in random order"""
     return sorted(lst, key=lambda x: random())
 
 
+def _rng(rnd):
+    """:returns: a Random instance from None (randomly seeded), an int seed or a Random instance"""
+    return rnd if isinstance(rnd, Random) else Random(rnd)
+
+
+def list_shuffle(lst, rnd=None):
+    """shuffles a mutable sequence in place (Fisher-Yates), O(n) no extra memory
+
+    :param list lst: list or any mutable sequence (i.e. array.array)
+    :param Random_or_int rnd: optional random.Random instance or seed for reproducible results
+    :returns: lst
+
+    :Example:
+        >>> list_shuffle(list(range(10)), 1)
+        [8, 0, 3, 4, 5, 2, 9, 6, 7, 1]
+    """
+    rand = _rng(rnd).random
+    for i in range(len(lst) - 1, 0, -1):
+        j = int(rand() * (i + 1))
+        lst[i], lst[j] = lst[j], lst[i]
+    return lst
+
+
+def sample(iterable, k, rnd=None):
+    """uniform random sample of k items from an iterable of unknown length in a single pass
+    (reservoir sampling algorithm L skips over items so random numbers drawn are O(k log(n/k)))
+
+    :param iterable iterable: any iterable (a generator, a file etc)
+    :param int k: sample size
+    :param Random_or_int rnd: optional random.Random instance or seed for reproducible results
+    :returns: a list of k items (all items if there are less than k)
+
+    :Example:
+        >>> sample(range(10 ** 6), 5, 1)
+        [419449, 387665, 352959, 117980, 664309]
+    """
+    rnd = _rng(rnd)
+    rand, randrange = rnd.random, rnd.randrange
+    it = iter(iterable)
+    reservoir = list(islice(it, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+    w = math.exp(math.log(1.0 - rand()) / k)
+    while True:
+        skip = int(math.log(1.0 - rand()) / math.log(1.0 - w)) if w < 1.0 else 0
+        for item in islice(it, skip, skip + 1):
+            reservoir[randrange(k)] = item
+            break
+        else:
+            return reservoir
+        w *= math.exp(math.log(1.0 - rand()) / k)
+
+
+def sample_weighted(iterable, k, weight=None, rnd=None):
+    """weighted random sample without replacement of k items from an iterable of unknown length in a single pass
+    (reservoir algorithm A-ExpJ by Efraimidis and Spirakis) items with weight <= 0 are never selected
+
+    :param iterable iterable: items or (item, weight) tuples if weight is None
+    :param int k: sample size
+    :param callable weight: optional function that returns weight of an item
+    :param Random_or_int rnd: optional random.Random instance or seed for reproducible results
+    :returns: a list of up to k items, most likely first
+
+    :Example:
+        >>> sample_weighted([('a', 1), ('b', 100), ('c', 1)], 1, rnd=1)
+        ['b']
+    """
+    rand = _rng(rnd).random
+    heap = []
+    if weight is not None:
+        iterable = ((item, weight(item)) for item in iterable)
+    it = ((cnt, item, item_weight) for cnt, (item, item_weight) in enumerate(iterable) if item_weight > 0)
+    for cnt, item, item_weight in islice(it, k):
+        heapq.heappush(heap, (math.log(1.0 - rand()) / item_weight, cnt, item))     # log(u ** (1 / w))
+    if len(heap) < k or k == 0:
+        return [i[2] for i in sorted(heap, reverse=True)]
+    jump, acc = math.log(1.0 - rand()) / heap[0][0], 0.0     # exponential jumps (A-ExpJ) one random per insertion
+    for cnt, item, item_weight in it:
+        acc += item_weight
+        if acc < jump:
+            continue
+        min_t = math.exp(heap[0][0] * item_weight)
+        key = math.log(min_t + (1.0 - min_t) * rand()) / item_weight
+        heapq.heapreplace(heap, (key, cnt, item))
+        jump, acc = math.log(1.0 - rand()) / heap[0][0], 0.0
+    return [i[2] for i in sorted(heap, reverse=True)]
+
+
+def benchmark_shuffle(sizes=(10 ** 6,), k=1000, seed=0):
+    """compares :func:`list_randomize` with :func:`list_shuffle`, :func:`sample` and :func:`sample_weighted`
+    (samples are drawn from a generator so nothing is materialized)
+
+    :param tuple sizes: list sizes to test i.e. (10 ** 6, 10 ** 7)
+    :param int k: sample size
+    :returns: a dictionary keyed by size with seconds for each approach
+    """
+    rt = {}
+    for size in sizes:
+        lst = list(range(size))
+        rt[size] = {}
+        started = _timer()
+        list_randomize(lst)
+        rt[size]['list_randomize_secs'] = _timer() - started
+        started = _timer()
+        list_shuffle(lst, seed)
+        rt[size]['list_shuffle_secs'] = _timer() - started
+        started = _timer()
+        sample((i for i in range(size)), k, seed)
+        rt[size]['sample_secs'] = _timer() - started
+        started = _timer()
+        sample_weighted((i for i in range(size)), k, weight=float, rnd=seed)
+        rt[size]['sample_weighted_secs'] = _timer() - started
+    return rt
+
+
 def list_pp(ll, separator='|', header_line=True, autonumber=True):
-    """pretty print list of lists ll"""
-    if autonumber:
-        for cnt, i in enumerate(ll):
-            i.insert(0, cnt if cnt > 0 or not header_line else '#')
-
-    def lenlst(l):
-        return [len(str(i)) for i in l]
-
-    lst_len = [lenlst(i) for i in ll]
-    lst_rot = zip(*lst_len[::-1])
-    lst_len = [max(i) for i in lst_rot]
-    frmt = separator + separator.join(["{!s:"+str(i)+"}" for i in lst_len]) + separator
-    if header_line:
-        header_line = '-' * len(frmt.format(*ll[0]))
-    for cnt, l in enumerate(ll):
-        if cnt < 2 and header_line:
-            print(header_line)
-        print(frmt.format(*l))
+    """pretty print list of lists ll, if header_line first row is the header
+    (ll is not modified, for big or streamed tables use :class:`~Hellas.Thebes.TableRenderer` directly)
+
+    :returns: list of column widths
+    """
     if header_line:
-        print(header_line)
-    return lst_len
+        table = TableRenderer(ll[0], separator=separator, autonumber=autonumber, start=1, sample_size=None)
+        table.render(ll[1:])
+    else:
+        table = TableRenderer(separator=separator, lines=False, autonumber=autonumber, start=0, sample_size=None)
+        table.render(ll)
+    return table.widths
 
 
 # signal -----------------------------------------------------------------------
@@ -106,6 +449,8 @@ def signal_terminate(on_terminate):
 class Base62(object):
     """unsigned integer coder class codes to and from base 62, useful for compressing integer values
 
+    symbols are in ascii order so fixed width codes (see width argument) sort as the numbers they encode
+
     .. Warning:: any encoded values can only be decoded by this class
 
     :Example:
@@ -116,15 +461,24 @@ class Base62(object):
         '18OWG'
         >>> b62.decode('18OWG')
         16777216
+        >>> b62.encode(vl, Base62.width_64)
+        '00000018OWG'
+        >>> b62.encode_many([0, 61, 62])
+        ['0', 'z', '10']
     """
     symbols = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
     numeric_symbols = symbols[:10]
+    width_64 = 11                                       # chars needed for any 64 bit value
+    width_128 = 22                                      # chars needed for any 128 bit value
+    _values = dict((ch, value) for value, ch in enumerate(symbols))
+    _pairs = tuple(map(''.join, product(symbols, repeat=2)))    # all 2 symbol codes 0..3843 we emit 2 digits per divmod
 
     def __repr__(self):
         return "<base62: (%s)>" % (self.symbols)
 
     @staticmethod
     def _code(number, from_digits, to_digits):
+        """generic (slow) conversion between digit strings, kept as a reference implementation"""
         x = 0
         len_from_digits = len(from_digits)
         len_to_digits = len(to_digits)
@@ -141,12 +495,200 @@ class Base62(object):
         return res
 
     @classmethod
-    def encode(cls, number):
-        return cls._code(number, cls.numeric_symbols, cls.symbols)
+    def encode(cls, number, width=None):
+        """
+        :param int number: an unsigned integer
+        :param int width: optional fixed width, code is left padded with '0'
+        :returns: base62 code
+        :raises ValueError: if number is negative or doesn't fit in width
+        """
+        number = int(number)
+        if number < 0:
+            raise ValueError("can't encode negative number {:d}".format(number))
+        pairs, parts = cls._pairs, []
+        while number >= 3844:
+            number, rem = divmod(number, 3844)
+            parts.append(pairs[rem])
+        parts.append(pairs[number] if number >= 62 else cls.symbols[number])
+        rt = ''.join(reversed(parts))
+        if width is not None:
+            if len(rt) > width:
+                raise ValueError("{} doesn't fit in {:d} symbols".format(rt, width))
+            rt = rt.rjust(width, '0')
+        return rt
 
     @classmethod
     def decode(cls, number):
-        return int(cls._code(number, cls.symbols, cls.numeric_symbols))
+        """
+        :param str number: a base62 code (padded or not)
+        :returns: int
+        :raises ValueError: on invalid symbols
+        """
+        values, rt = cls._values, 0
+        try:
+            for ch in str(number):
+                rt = rt * 62 + values[ch]
+        except KeyError as e:
+            raise ValueError("invalid base62 symbol {!r}".format(e.args[0]))
+        return rt
+
+    @classmethod
+    def encode_many(cls, numbers, width=None):
+        """encodes an iterable of unsigned integers, numpy integer arrays are encoded vectorized
+
+        :param iterable numbers: list, array, numpy array or any iterable of unsigned integers
+        :param int width: optional fixed width (see :meth:`encode`)
+        :returns: a list of codes
+        """
+        if np is not None and isinstance(numbers, np.ndarray) and numbers.dtype.kind in 'ui' and numbers.dtype.itemsize <= 8:
+            return cls._encode_many_np(numbers, width)
+        encode = cls.encode
+        return [encode(number, width) for number in numbers]
+
+    @classmethod
+    def _encode_many_np(cls, numbers, width=None):
+        if numbers.dtype.kind == 'i' and (numbers < 0).any():
+            raise ValueError("can't encode negative numbers")
+        numbers = numbers.ravel().astype(np.uint64)
+        size = cls.width_64 if width is None else width
+        digits = np.empty((len(numbers), size), dtype=np.uint8)
+        base = np.uint64(62)
+        for col in range(size - 1, -1, -1):
+            numbers, digits[:, col] = np.divmod(numbers, base)
+        if numbers.any():
+            raise ValueError("numbers don't fit in {:d} symbols".format(size))
+        symbols = np.frombuffer(cls.symbols.encode('ascii'), dtype=np.uint8)
+        rt = symbols[digits].view('S{:d}'.format(size)).ravel().astype('U{:d}'.format(size)).tolist()
+        if width is None:
+            rt = [code.lstrip('0') or '0' for code in rt]
+        return rt
+
+    @classmethod
+    def decode_many(cls, codes, typecode=None):
+        """decodes an iterable of codes
+
+        :param iterable codes: base62 codes
+        :param str typecode: if given returns an array.array of this typecode (i.e. 'Q') instead of a list
+        :returns: a list or an array of ints
+        """
+        decode = cls.decode
+        rt = [decode(code) for code in codes]
+        return rt if typecode is None else array(typecode, rt)
+
+    # byte strings (uuids, digests etc) -------------------------------------------
+    @staticmethod
+    def bytes_width(length):
+        """:returns: number of symbols needed for any byte string of length bytes (16 -> 22, 20 -> 27)"""
+        return max(1, int(math.ceil(length * 8 / math.log(62, 2) - 1e-9)))
+
+    @staticmethod
+    def bytes_length(width):
+        """:returns: byte string length that codes of width symbols decode to (inverse of :meth:`bytes_width`)"""
+        return ((62 ** width).bit_length() - 1) // 8
+
+    @classmethod
+    def encode_bytes(cls, data, width=None):
+        """encodes a byte string, leading zero bytes are preserved since codes have a fixed width per data length
+
+        :param bytes data: any bytes like object (uuid.bytes, hashlib digest etc)
+        :param int width: optional width defaults to :meth:`bytes_width` of len(data)
+        :returns: base62 code
+
+        :Example:
+            >>> Base62.encode_bytes(b'\\x00\\x00\\xff')
+            '00047'
+            >>> Base62.decode_bytes('00047')
+            b'\\x00\\x00\\xff'
+        """
+        return cls.encode(int.from_bytes(data, 'big'), cls.bytes_width(len(data)) if width is None else width)
+
+    @classmethod
+    def decode_bytes(cls, code, length=None):
+        """
+        :param str code: a code produced by :meth:`encode_bytes`
+        :param int length: optional byte length defaults to :meth:`bytes_length` of len(code)
+        :returns: bytes
+        :raises ValueError: on invalid symbols or if value doesn't fit in length bytes
+        """
+        length = cls.bytes_length(len(code)) if length is None else length
+        try:
+            return cls.decode(code).to_bytes(length, 'big')
+        except OverflowError:
+            raise ValueError("{} doesn't fit in {} bytes".format(code, length))
+
+    @classmethod
+    def encode_bytes_many(cls, datas, width=None):
+        """encodes an iterable of byte strings (see :meth:`encode_bytes`)
+
+        :returns: a list of codes
+        """
+        widths, encode, from_bytes, rt = {}, cls.encode, int.from_bytes, []
+        for data in datas:
+            if width is None:
+                size = len(data)
+                data_width = widths.get(size)
+                if data_width is None:
+                    data_width = widths[size] = cls.bytes_width(size)
+            else:
+                data_width = width
+            rt.append(encode(from_bytes(data, 'big'), data_width))
+        return rt
+
+    @classmethod
+    def decode_bytes_many(cls, codes, length=None):
+        """decodes an iterable of codes (see :meth:`decode_bytes`)
+
+        :returns: a list of byte strings
+        """
+        lengths, decode, rt = {}, cls.decode, []
+        try:
+            for code in codes:
+                if length is None:
+                    size = len(code)
+                    code_length = lengths.get(size)
+                    if code_length is None:
+                        code_length = lengths[size] = cls.bytes_length(size)
+                else:
+                    code_length = length
+                rt.append(decode(code).to_bytes(code_length, 'big'))
+        except OverflowError:
+            raise ValueError("{} doesn't fit in {} bytes".format(code, code_length))
+        return rt
+
+
+def benchmark_base62(count=10 ** 5, bits=(64, 128), seed=0):
+    """compares :class:`Base62` with the reference string based :meth:`Base62._code`
+
+    :param int count: numbers to encode per bit size
+    :param tuple bits: bit sizes of random numbers
+    :returns: a dictionary keyed by bits with seconds per approach and speedups
+    """
+    rnd = Random(seed)
+    rt = {}
+    for nbits in bits:
+        numbers = [rnd.getrandbits(nbits) for i in range(count)]
+        started = _timer()
+        codes = [Base62._code(number, Base62.numeric_symbols, Base62.symbols) for number in numbers]
+        ref_encode_secs = _timer() - started
+        started = _timer()
+        [int(Base62._code(code, Base62.symbols, Base62.numeric_symbols)) for code in codes]
+        ref_decode_secs = _timer() - started
+        started = _timer()
+        new_codes = Base62.encode_many(numbers)
+        encode_secs = _timer() - started
+        started = _timer()
+        decoded = Base62.decode_many(new_codes)
+        decode_secs = _timer() - started
+        assert new_codes == codes and decoded == numbers
+        rt[nbits] = {'ref_encode_secs': ref_encode_secs, 'encode_secs': encode_secs,
+                     'ref_decode_secs': ref_decode_secs, 'decode_secs': decode_secs,
+                     'encode_speedup': ref_encode_secs / encode_secs, 'decode_speedup': ref_decode_secs / decode_secs}
+        if np is not None and nbits <= 64:
+            arr = np.array(numbers, dtype=np.uint64)
+            started = _timer()
+            assert Base62.encode_many(arr) == codes
+            rt[nbits]['numpy_encode_secs'] = _timer() - started
+    return rt
 
 
 def obj_id_expanded(obj=None, size=99):
@@ -157,3 +699,131 @@ def obj_id_expanded(obj=None, size=99):
     :Returns: id: (str) an id that of the form machine-name|ppid|pid|id(obj)
     """
     return "{}|{}|{}{}".format(os.uname()[1], os.getppid(), os.getpid(), "" if obj is None else "|" + str(id(obj))[-size:])
+
+
+class IdGenerator(object):
+    """thread safe generator of k-sortable unique 64 bit ids of the form timestamp|node|sequence
+    (millisecond timestamp since epoch_ms: 41 bits, node: 10 bits, sequence: 12 bits)
+
+    host and process components are computed once and recomputed in a child process after fork,
+    ids generated in the same millisecond are ordered by sequence, when the sequence is exhausted
+    (or clock goes backwards) the timestamp is advanced logically so ids never repeat and calls never block.
+
+    .. Warning:: ids are unique only among generators with different nodes, default node is
+       (crc32(host) ^ pid) & 1023 so processes whose pids differ by a multiple of 1024 collide
+       (a forked child always gets a node different from its parent's), pass unique nodes explicitly
+       when ids must be unique across processes or hosts. A generator with an explicit node raises
+       :class:`ErrorIdNode` in a forked child until :meth:`set_node` assigns it a new node.
+
+    :param int node: node number 0..1023 defaults to a value derived from host name and pid
+    :param int epoch_ms: epoch in milliseconds since unix epoch (defaults to 2015-01-01 ~69 years of ids)
+
+    :Example:
+        >>> idg = IdGenerator(node=1)
+        >>> idg.next_id()
+        1561343660212097024
+        >>> IdGenerator.split(1561343660212097024)
+        (1792323736.957, 1, 0)
+        >>> Base62.encode(1561343660212097024, Base62.width_64)     # same as idg.next_b62()
+        '1rKyAi6Bzvs'
+    """
+    NODE_BITS = 10
+    SEQ_BITS = 12
+    NODE_MASK = (1 << NODE_BITS) - 1
+    SEQ_MASK = (1 << SEQ_BITS) - 1
+    EPOCH_MS = 1420070400000            # 2015-01-01 00:00:00 UTC
+    _instances = weakref.WeakSet()
+
+    def __init__(self, node=None, epoch_ms=EPOCH_MS):
+        self._node = None if node is None else node & self.NODE_MASK
+        self.epoch_ms = epoch_ms
+        self.node = None
+        self._forked = False
+        self._reset()
+        self._instances.add(self)
+
+    def _reset(self, forked=False):
+        """(re)computes process components also called in a child after fork"""
+        self._lock = threading.Lock()
+        self.host = os.uname()[1]
+        self.pid, self.ppid = os.getpid(), os.getppid()
+        self._prefix = "{}|{}|{}".format(self.host, self.ppid, self.pid)
+        node = self._node
+        if node is None:
+            node = (zlib.crc32(self.host.encode('utf-8')) ^ self.pid) & self.NODE_MASK
+            if forked and node == self.node:            # never share parent's node
+                node = (node + 1) & self.NODE_MASK
+        else:
+            self._forked = self._forked or forked
+        self.node = node
+        self._node_bits = node << self.SEQ_BITS
+        self._last_ms = -1
+        self._seq = 0
+
+    def set_node(self, node):
+        """assigns an explicit node (i.e. to a forked child of a generator with explicit node)"""
+        with self._lock:
+            self._node = node & self.NODE_MASK
+            self._forked = False
+            self.node = self._node
+            self._node_bits = self.node << self.SEQ_BITS
+
+    def __repr__(self):
+        return "<{}: node:{:d} pid:{:d}>".format(self.__class__.__name__, self.node, self.pid)
+
+    def next_id(self):
+        """:returns: a new int id"""
+        if _at_fork is None and os.getpid() != self.pid:
+            self._reset(forked=True)
+        if self._forked:
+            raise ErrorIdNode("explicit node {:d} is used by parent process, call set_node in child".format(self.node))
+        with self._lock:
+            now = int(time.time() * 1000) - self.epoch_ms
+            if now > self._last_ms:
+                self._last_ms, self._seq = now, 0
+            else:
+                self._seq = (self._seq + 1) & self.SEQ_MASK
+                if self._seq == 0:
+                    self._last_ms += 1
+            return (self._last_ms << (self.NODE_BITS + self.SEQ_BITS)) | self._node_bits | self._seq
+
+    def next_b62(self):
+        """:returns: a new id as a fixed width (11 chars) sortable :class:`Base62` code"""
+        return Base62.encode(self.next_id(), Base62.width_64)
+
+    def expanded(self, obj=None, size=99):
+        """same as :func:`obj_id_expanded` but with cached host and process components"""
+        return self._prefix if obj is None else "{}|{}".format(self._prefix, str(id(obj))[-size:])
+
+    @classmethod
+    def split(cls, id_int, epoch_ms=EPOCH_MS):
+        """:returns: tuple (unix timestamp seconds, node, sequence) of an id"""
+        return (((id_int >> (cls.NODE_BITS + cls.SEQ_BITS)) + epoch_ms) / 1000.0,
+                (id_int >> cls.SEQ_BITS) & cls.NODE_MASK, id_int & cls.SEQ_MASK)
+
+
+def _reset_id_generators():
+    for idg in list(IdGenerator._instances):
+        idg._reset(forked=True)
+
+
+_at_fork = getattr(os, 'register_at_fork', None)    # not on windows, next_id checks pid there
+if _at_fork is not None:
+    _at_fork(after_in_child=_reset_id_generators)
+
+
+def benchmark_ids(count=10 ** 5):
+    """compares ids per second of :class:`IdGenerator` with :func:`obj_id_expanded`
+
+    :returns: a dictionary with seconds and ids per second for each approach
+    """
+    rt = {}
+    idg = IdGenerator()
+    for name, func in (('obj_id_expanded', obj_id_expanded), ('expanded', idg.expanded),
+                       ('next_id', idg.next_id), ('next_b62', idg.next_b62)):
+        started = _timer()
+        for i in range(count):
+            func()
+        secs = _timer() - started
+        rt[name + '_secs'], rt[name + '_per_sec'] = secs, count / secs
+    return rt
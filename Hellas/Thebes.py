@@ -3,9 +3,22 @@
 """
 
 import re
+import os
+import sys
+import mmap
+import time
+import threading
+import weakref
+from multiprocessing.sharedctypes import RawArray
+from collections import deque, Counter
+from itertools import chain, islice, repeat
+from Hellas._compat import np, _timer   # np is None without numpy, MacAddressArray falls back to array('Q')
 from Hellas.Sparta import chunks_str, seconds_to_DHMS
 from Hellas.Sparta import DotDot, FMT_DT_GENERIC
 from datetime import datetime
+from array import array
+
+_format_header_cache = {}
 
 
 def format_header(frmt, return_len=False):
@@ -28,6 +41,13 @@ def format_header(frmt, return_len=False):
         |         100|  10.50|   10|
 
     """
+    rt = _format_header_cache.get(frmt)
+    if rt is None:
+        rt = _format_header_cache[frmt] = _format_header(frmt)
+    return rt[0] if return_len is False else rt
+
+
+def _format_header(frmt):
     names = re.sub("{(.*?):.*?}", r"\1", frmt)
     names = [i for i in names.split("|") if i]
     frmt_clean = re.sub("\.\df", r"", frmt)                 # get read of floats i.e {:8.2f}
@@ -37,7 +57,7 @@ def format_header(frmt, return_len=False):
     header = header_frmt.format(*names)
     header_len = len(header)
     header = "{}\n{}\n{}\n".format("." * header_len, header, "." * header_len)
-    return header.strip() if return_len is False else (header.strip(), header_len)
+    return header.strip(), header_len
 
 
 def chunks_str_frame(a_str, n=None, center=True):
@@ -68,10 +88,156 @@ def chunks_str_frame(a_str, n=None, center=True):
     return "╔{}╗\n║{}{}║\n╚{}╝".format('═' * n, r, spcs, '═' * n)
 
 
+class TableRenderer(object):
+    """renders rows of sequences as a text table, row format is compiled once
+    columns are sized from a fixed schema (widths) or from a sample of rows, rows are streamed
+    from any iterable to a buffered writer and never modified
+
+    :param list header: optional column names
+    :param list widths: optional fixed column widths (excluding autonumber column) else columns are sized
+        on first render from its first sample_size rows (cells exceeding widths later just widen their row)
+    :param str separator: column separator
+    :param bool lines: draw lines around header and at the end
+    :param bool autonumber: prepend a row counter column
+    :param int start: first row number
+    :param int sample_size: number of rows to size columns from (None for all rows)
+    :param int buffer_rows: number of rows to buffer per write
+
+    :Example:
+        >>> TableRenderer(['name', 'count'], autonumber=True).render([['foo', 1], ['bar', 1000]])
+        --------------
+        |#|name|count|
+        --------------
+        |1|foo |1    |
+        |2|bar |1000 |
+        --------------
+        2
+    """
+    def __init__(self, header=None, widths=None, separator='|', lines=True, autonumber=False, start=1,
+                 sample_size=1000, buffer_rows=1000):
+        self.header = None if header is None else list(header)
+        self.widths = None if widths is None else list(widths)
+        self.separator = separator
+        self.lines = lines
+        self.autonumber = autonumber
+        self.start = start
+        self.sample_size = sample_size
+        self.buffer_rows = buffer_rows
+        self._format = None
+        if self.widths is not None:
+            self.compile([7] + self.widths if autonumber else self.widths)     # counter fits 9,999,999 rows
+
+    def __repr__(self):
+        return "<{}: widths:{}>".format(self.__class__.__name__, self.widths)
+
+    def fit(self, rows, total=None):
+        """computes column widths from rows (including header and autonumber column)
+
+        :param list rows: a list of rows (sample)
+        :param int total: total number of rows used to size the autonumber column, if None (unknown)
+            it is sized as for fixed widths to fit 9,999,999 rows
+        :returns: list of widths
+        """
+        widths = [] if self.header is None else [len(str(i)) for i in self.header]
+        for row in rows:
+            if len(row) > len(widths):
+                widths.extend([0] * (len(row) - len(widths)))
+            for col, cell in enumerate(row):
+                size = len(str(cell))
+                if size > widths[col]:
+                    widths[col] = size
+        if self.autonumber:
+            if total is None:
+                widths.insert(0, max(7, len(str(self.start))))
+            else:
+                widths.insert(0, max(len(str(self.start + total - 1)), len(str(self.start))))
+        return self.compile(widths)
+
+    def compile(self, widths):
+        """compiles row format from widths (including autonumber column if any)"""
+        self.widths = list(widths)
+        frmt = self.separator + self.separator.join(["{!s:" + str(i) + "}" for i in self.widths]) + self.separator
+        self._format = frmt.format
+        self.line = '-' * len(frmt.format(*[''] * len(self.widths)))
+        return self.widths
+
+    def format_row(self, row, number=None):
+        """:returns: a formatted row string"""
+        return self._format(number, *row) if self.autonumber else self._format(*row)
+
+    def render(self, rows, out=None):
+        """writes the table to out
+
+        :param iterable rows: any iterable of rows
+        :param file out: any object with a write method defaults to sys.stdout
+        :returns: number of rows written
+        """
+        out = sys.stdout if out is None else out
+        if self._format is None:
+            if self.sample_size is None:
+                rows = list(rows)
+                self.fit(rows, len(rows))
+            else:
+                total = len(rows) if hasattr(rows, '__len__') else None
+                rows = iter(rows)
+                sample = list(islice(rows, self.sample_size))
+                if total is None and len(sample) < self.sample_size:        # exhausted, so all rows are known
+                    total = len(sample)
+                self.fit(sample, total)
+                rows = chain(sample, rows)
+        frmt, write = self._format, out.write
+        buf = []
+        if self.header is not None:
+            if self.lines:
+                buf.append(self.line)
+            buf.append(frmt('#', *self.header) if self.autonumber else frmt(*self.header))
+        if self.lines:
+            buf.append(self.line)
+        cnt = 0
+        for cnt, row in enumerate(rows, 1):
+            buf.append(frmt(self.start + cnt - 1, *row) if self.autonumber else frmt(*row))
+            if len(buf) >= self.buffer_rows:
+                buf.append('')
+                write('\n'.join(buf))
+                buf = []
+        if self.lines and (cnt or self.header is None):
+            buf.append(self.line)
+        if buf:
+            buf.append('')
+            write('\n'.join(buf))
+        return cnt
+
+
+def benchmark_table(rows=10 ** 5, columns=8, seed=0):
+    """compares rows per second of :class:`TableRenderer` with a list_pp like approach
+    (str of every cell to size columns and one print per row), output goes to an in memory buffer
+
+    :returns: a dictionary with seconds and rows per second for each approach
+    """
+    import io
+    from random import Random
+    rnd = Random(seed)
+    data = [[rnd.choice(('foo', 'bar', 12345, 3.14, None)) for c in range(columns)] for r in range(rows)]
+    out = io.StringIO()
+    started = _timer()
+    widths = [max(i) for i in zip(*[[len(str(cell)) for cell in row] for row in data])]
+    frmt = '|' + '|'.join(["{!s:" + str(i) + "}" for i in widths]) + '|'
+    for row in data:
+        print(frmt.format(*row), file=out)
+    loop_secs = _timer() - started
+    loop_out, out = out.getvalue(), io.StringIO()
+    started = _timer()
+    TableRenderer(lines=False).render(data, out)
+    render_secs = _timer() - started
+    assert out.getvalue() == loop_out
+    return {'loop_secs': loop_secs, 'loop_rows_per_sec': rows / loop_secs,
+            'render_secs': render_secs, 'render_rows_per_sec': rows / render_secs}
+
+
 class MacAddress(object):
     """ stores mac as int
     """
-    _mac_regx = re.compile(r'^([0-9A-F]{1,2})' + '\:([0-9A-F]{1,2})'*5 + '$', re.IGNORECASE)
+    _mac_regx = re.compile(r'^([0-9A-F]{1,2})' + r'\:([0-9A-F]{1,2})'*5 + '$', re.IGNORECASE)
     # @todo move class to Hellas
 
     def __init__(self, mac_str, validate=True):
@@ -86,6 +252,25 @@ class MacAddress(object):
     def __str__(self):
         return self.mac_expand(self.mac_from_int(self._mac), upper=False, lower=False)
 
+    def __repr__(self):
+        return "<{}: {}>".format(self.__class__.__name__, self)
+
+    def __eq__(self, other):
+        return isinstance(other, MacAddress) and self._mac == other._mac
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._mac)
+
+    @classmethod
+    def from_int(cls, mac_int):
+        """creates an instance from an int without parsing"""
+        rt = cls.__new__(cls)
+        rt._mac = mac_int
+        return rt
+
     @classmethod
     def mac_validate(cls, mac_str):
         return cls._mac_regx.match(mac_str)
@@ -110,7 +295,390 @@ class MacAddress(object):
         """returns a mac string from int  'c81ee716c167'
            to make it proper mac string pass result to mac_expand
         """
-        return hex(mac_int)[2:]
+        return '{:012x}'.format(mac_int)
+
+
+_MAC_SEPARATORS = {ord(':'): None, ord('-'): None}
+_MAC_HEX_DIGITS = '0123456789abcdefABCDEF'
+_MAC_HEX_COLS = [0, 1, 3, 4, 6, 7, 9, 10, 12, 13, 15, 16]       # hex digit positions in 'aa:bb:cc:dd:ee:ff'
+_MAC_SEP_COLS = [2, 5, 8, 11, 14]
+_MAC_HEX_NL = dict.fromkeys(map(ord, '0123456789abcdefABCDEF\n'))
+
+
+def mac_parse(mac_str):
+    """parses a mac address string with ':' or '-' separators (1 or 2 digits per octet) or 12 hex digits, any case
+
+    :returns: int
+    :raises ValueError: if mac_str is not a valid mac address
+    """
+    mac_str = mac_str.strip()
+    if (len(mac_str) == 17 and not mac_str[2::3].strip(':-')) or len(mac_str) == 12:
+        mac_hex = mac_str.translate(_MAC_SEPARATORS)
+        if len(mac_hex) == 12 and not mac_hex.strip(_MAC_HEX_DIGITS):   # int() accepts non ascii digits
+            return int(mac_hex, 16)
+    if MacAddress.mac_validate(mac_str.replace('-', ':')) is not None:          # 1 digit octets i.e. a:b:c:d:e:ff
+        return int(''.join([i.zfill(2) for i in mac_str.replace('-', ':').split(':')]), 16)
+    raise ValueError("invalid mac address {!r}".format(mac_str))
+
+
+class MacAddressArray(object):
+    """a packed collection of mac addresses stored as 64 bit ints in a numpy uint64 array (if available) or array('Q')
+    with bulk parsing and formatting, sorting, dedup and set operations,
+    items are returned as :class:`MacAddress` instances
+
+    :param iterable macs: ints, strings or :class:`MacAddress` instances
+    :param bool use_numpy: defaults to True if numpy is available
+
+    :Example:
+        >>> macs = MacAddressArray.from_strings(['AC:86:74:07:56:28', '00-1e-c2-9e-28-6b', 'ac:86:74:07:56:28'])
+        >>> macs.unique().to_strings()
+        ['00:1e:c2:9e:28:6b', 'ac:86:74:07:56:28']
+        >>> macs[0]
+        <MacAddress: ac:86:74:07:56:28>
+        >>> '00:1E:C2:9E:28:6B' in macs
+        True
+    """
+    def __init__(self, macs=(), use_numpy=None):
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        if self.use_numpy and isinstance(macs, np.ndarray):
+            self.data = macs.astype(np.uint64)
+        elif isinstance(macs, array) and macs.typecode == 'Q' and not self.use_numpy:
+            self.data = macs
+        else:
+            ints = [self._to_int(i) for i in macs]
+            self.data = np.array(ints, dtype=np.uint64) if self.use_numpy else array('Q', ints)
+
+    @staticmethod
+    def _to_int(mac):
+        if isinstance(mac, int):
+            return mac
+        if isinstance(mac, MacAddress):
+            return int(mac)
+        return mac_parse(mac)
+
+    def _new(self, data):
+        return self.__class__(data, self.use_numpy)
+
+    def __repr__(self):
+        return "<{}: {:d} macs>".format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._new(self.data[index])
+        return MacAddress.from_int(int(self.data[index]))
+
+    def __iter__(self):
+        from_int = MacAddress.from_int
+        return (from_int(i) for i in self.ints())
+
+    def __contains__(self, mac):
+        mac = self._to_int(mac)
+        return bool((self.data == np.uint64(mac)).any()) if self.use_numpy else mac in self.data
+
+    def ints(self):
+        """:returns: a list of ints"""
+        return self.data.tolist()
+
+    def append(self, mac):
+        self.extend([mac])
+
+    def extend(self, macs):
+        """appends ints, strings or :class:`MacAddress` instances (or another MacAddressArray)"""
+        if isinstance(macs, MacAddressArray):
+            macs = macs.data
+        if not isinstance(macs, array) and not (np is not None and isinstance(macs, np.ndarray)):
+            macs = [self._to_int(i) for i in macs]
+        if self.use_numpy:
+            self.data = np.concatenate((self.data, np.asarray(macs, dtype=np.uint64)))
+        else:
+            self.data.extend(array('Q', macs))
+
+    @classmethod
+    def from_strings(cls, mac_strings, errors='raise', use_numpy=None):
+        """bulk parses mac address strings (vectorized with numpy when all are of the form aa:bb:cc:dd:ee:ff)
+
+        :param list mac_strings: an iterable of strings (see :func:`mac_parse` for accepted formats)
+        :param str errors: 'raise' raises ValueError on an invalid string, 'skip' skips it
+        :returns: a MacAddressArray
+        """
+        mac_strings = mac_strings if isinstance(mac_strings, list) else list(mac_strings)
+        rt = cls((), use_numpy)
+        if mac_strings and set(map(len, mac_strings)) == {17}:
+            values = _mac_parse_np(mac_strings) if rt.use_numpy else _mac_parse_uniform(mac_strings)
+            if values is not None:
+                rt.data = values
+                return rt
+        ints = []
+        for mac_str in mac_strings:
+            try:
+                ints.append(mac_parse(mac_str))
+            except ValueError:
+                if errors != 'skip':
+                    raise
+        rt.data = np.array(ints, dtype=np.uint64) if rt.use_numpy else array('Q', ints)
+        return rt
+
+    @classmethod
+    def from_file(cls, path_or_obj, errors='raise', use_numpy=None, block_lines=65536):
+        """bulk parses a file with one mac address per line (see :meth:`from_strings`) a block of lines at a time,
+        so memory used besides the result is independent of file size
+
+        :param str_or_object path_or_obj: fool pathname string for a file or a file like object that supports read
+        :param int block_lines: lines parsed per block
+        """
+        rt = cls((), use_numpy)
+        parts = []
+        fin = path_or_obj if hasattr(path_or_obj, 'read') else open(path_or_obj, 'rb')
+        try:
+            for block in iter(lambda: list(islice(fin, block_lines)), []):
+                if isinstance(block[0], bytes):
+                    block = b''.join(block).decode('ascii', 'replace')
+                else:
+                    block = ''.join(block)
+                parts.append(cls.from_strings(block.split(), errors, rt.use_numpy).data)
+        finally:
+            if fin is not path_or_obj:
+                fin.close()
+        if parts and rt.use_numpy:
+            rt.data = np.concatenate(parts)
+        else:
+            for part in parts:
+                rt.data.extend(part)
+        return rt
+
+    def to_strings(self, separator=':', upper=False):
+        """bulk formats to a list of strings like 'ac:86:74:07:56:28' (vectorized with numpy)"""
+        if self.use_numpy:
+            return _mac_format_np(self.data, separator, upper)
+        octets = ['{:02X}'.format(i) if upper else '{:02x}'.format(i) for i in range(256)]
+        join = separator.join
+        return [join((octets[i >> 40], octets[i >> 32 & 255], octets[i >> 24 & 255],
+                      octets[i >> 16 & 255], octets[i >> 8 & 255], octets[i & 255])) for i in self.data]
+
+    def sort(self):
+        """sorts in place, :returns: self"""
+        if self.use_numpy:
+            self.data.sort()
+        else:
+            self.data = array('Q', sorted(self.data))
+        return self
+
+    def unique(self):
+        """:returns: a new sorted MacAddressArray without duplicates"""
+        return self._new(np.unique(self.data) if self.use_numpy else array('Q', sorted(set(self.data))))
+
+    def isin(self, other):
+        """:returns: a bool per item, True if item is in other (numpy bool array or list)"""
+        other = other if isinstance(other, MacAddressArray) else self._new(other)
+        if self.use_numpy:
+            return np.isin(self.data, other.data.astype(np.uint64))
+        others = set(other.data)
+        return [i in others for i in self.data]
+
+    def union(self, other):
+        """:returns: a new sorted unique MacAddressArray"""
+        return self._set_op(other, 'union1d', set.union)
+
+    def intersection(self, other):
+        """:returns: a new sorted unique MacAddressArray"""
+        return self._set_op(other, 'intersect1d', set.intersection)
+
+    def difference(self, other):
+        """:returns: a new sorted unique MacAddressArray of items not in other"""
+        return self._set_op(other, 'setdiff1d', set.difference)
+
+    __or__, __and__, __sub__ = union, intersection, difference
+
+    def _set_op(self, other, np_func, set_func):
+        other = other if isinstance(other, MacAddressArray) else self._new(other)
+        if self.use_numpy:
+            return self._new(getattr(np, np_func)(self.data, np.asarray(other.data, dtype=np.uint64)))
+        return self._new(array('Q', sorted(set_func(set(self.data), set(other.data)))))
+
+
+def _mac_parse_uniform(mac_strings):
+    """parses strings of the form aa:bb:cc:dd:ee:ff validating all at once with slicing and translate,
+    returns array('Q') or None if any is invalid
+    """
+    joined = '\n'.join(mac_strings) + '\n'
+    if joined[17::18].strip('\n') or any(joined[col::18].strip(':-') for col in _MAC_SEP_COLS):
+        return None
+    hexs = joined.translate(_MAC_SEPARATORS)
+    if len(hexs) != 13 * len(mac_strings) or hexs.count('\n') != len(mac_strings) or hexs.translate(_MAC_HEX_NL):
+        return None
+    return array('Q', map(int, hexs.split(), repeat(16)))
+
+
+def _mac_parse_np(mac_strings):
+    """vectorized parsing of strings of the form aa:bb:cc:dd:ee:ff returns None if any is invalid"""
+    try:
+        buf = ('\n'.join(mac_strings) + '\n').encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    chars = np.frombuffer(buf, dtype=np.uint8).reshape(-1, 18)
+    seps = chars[:, _MAC_SEP_COLS]
+    nibbles = _HEX_LUT[chars[:, _MAC_HEX_COLS]]
+    if (nibbles == 255).any() or not ((seps == ord(':')) | (seps == ord('-'))).all():
+        return None
+    return (nibbles.astype(np.uint64) << _MAC_SHIFTS).sum(axis=1, dtype=np.uint64)
+
+
+def _mac_format_np(values, separator=':', upper=False):
+    chars = np.empty((len(values), 17), dtype=np.uint8)
+    chars[:, _MAC_SEP_COLS] = ord(separator)
+    symbols = np.frombuffer(b'0123456789ABCDEF' if upper else b'0123456789abcdef', dtype=np.uint8)
+    chars[:, _MAC_HEX_COLS] = symbols[(values[:, None] >> _MAC_SHIFTS) & np.uint64(15)]
+    return chars.view('S17').ravel().astype('U17').tolist()
+
+
+if np is not None:
+    _HEX_LUT = np.full(256, 255, dtype=np.uint8)
+    for _i, _ch in enumerate('0123456789abcdef'):
+        _HEX_LUT[ord(_ch)] = _HEX_LUT[ord(_ch.upper())] = _i
+    _MAC_SHIFTS = np.arange(44, -1, -4, dtype=np.uint64)
+
+
+def _mac_classes_table():
+    table = bytearray(b'x' * 256)               # x: can't be part of or next to a mac, safe place to cut a chunk
+    for ch in b'0123456789abcdefABCDEF':
+        table[ch] = ord('h')
+    for ch in b'ghijklmnopqrstuvwxyzGHIJKLMNOPQRSTUVWXYZ':
+        table[ch] = ord('g')
+    table[ord(':')] = table[ord('-')] = ord('s')
+    return bytes(table)
+
+
+MAC_SCAN_CHUNK = 4 * 1024 * 1024
+_MAC_CLASSES = _mac_classes_table()
+# matched against bytes translated to character classes, h: hex digit, g: other alnum, s: separator
+# so the search is for a literal, lookarounds reject macs that are part of longer hex or octet sequences
+_MAC_SCAN_RE = re.compile(br'hhshhshhshhshhshh(?!h|sh)(?<=(?<!h)(?<!(?<![hg])hhs)hhshhshhshhshhshh)')
+
+
+def _mac_chunks_read(file_obj, chunk_size):
+    read = file_obj.read
+    chunk = read(chunk_size)
+    while chunk:
+        yield chunk
+        chunk = read(chunk_size)
+
+
+def _mac_chunks(path_or_obj, chunk_size):
+    if hasattr(path_or_obj, 'read'):
+        for chunk in _mac_chunks_read(path_or_obj, chunk_size):
+            yield chunk
+        return
+    with open(path_or_obj, 'rb') as fin:
+        mm = None
+        if os.fstat(fin.fileno()).st_size:
+            try:
+                mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):           # pipes, devices, sysfs files can't be mapped
+                pass
+        if mm is None:                              # empty or unmappable (i.e. /proc files report size 0), read it
+            for chunk in _mac_chunks_read(fin, chunk_size):
+                yield chunk
+            return
+        try:
+            for pos in range(0, len(mm), chunk_size):
+                yield mm[pos:pos + chunk_size]
+        finally:
+            mm.close()
+
+
+def _mac_matches(path_or_obj, chunk_size):
+    """yields lists of raw mac bytes per chunk, chunks are cut at bytes that can't touch a mac so none is split"""
+    finditer, tail = _MAC_SCAN_RE.finditer, b''
+    for chunk in _mac_chunks(path_or_obj, chunk_size):
+        buf = tail + chunk if tail else chunk
+        classes = buf.translate(_MAC_CLASSES)
+        cut = classes.rfind(b'x')
+        if cut < 0:
+            tail = buf
+            continue
+        yield [buf[m.start():m.end()] for m in finditer(classes, 0, cut + 1)]
+        tail = buf[cut:]
+    if tail:
+        yield [tail[m.start():m.end()] for m in finditer(tail.translate(_MAC_CLASSES))]
+
+
+def mac_scan(path_or_obj, packed=False, chunk_size=MAC_SCAN_CHUNK):
+    """finds all mac addresses (any case, ':' or '-' separators) in a file i.e. a log
+    a path is memory mapped (read in chunks if it can't be), a file like object is read in chunks,
+    memory used is independent of file size
+
+    :param str_or_object path_or_obj: fool pathname string for a file or a binary file like object that supports read
+    :param bool packed: yield an array('Q') per chunk instead of single ints
+    :param int chunk_size: bytes per chunk
+    :returns: a generator of ints (or arrays if packed)
+
+    :Example:
+        >>> list(mac_scan(io.BytesIO(b'DHCPACK to AC:86:74:07:56:28 via eth0, ac-86-74-07-56-29')))
+        [189693472233000, 189693472233001]
+    """
+    for matches in _mac_matches(path_or_obj, chunk_size):
+        ints = [int(i.translate(None, b':-'), 16) for i in matches]
+        if packed:
+            yield array('Q', ints)
+        else:
+            for mac_int in ints:
+                yield mac_int
+
+
+def mac_count(path_or_obj, counter=None, chunk_size=MAC_SCAN_CHUNK):
+    """counts mac addresses in a file (see :func:`mac_scan`) raw matches are counted per chunk
+    and converted to ints once per distinct spelling
+
+    :param collections.Counter counter: optional counter to update
+    :returns: a Counter of mac int: occurrences
+    """
+    counter = Counter() if counter is None else counter
+    raw = Counter()
+    for matches in _mac_matches(path_or_obj, chunk_size):
+        raw.update(matches)
+    for mac_raw, cnt in raw.items():
+        counter[int(mac_raw.translate(None, b':-'), 16)] += cnt
+    return counter
+
+
+def benchmark_mac_scan(lines=2 * 10 ** 5, seed=0):
+    """compares MBytes per second of :func:`mac_scan` and :func:`mac_count` (on a file, memory mapped)
+    with splitting each line to tokens and testing them with :meth:`MacAddress.mac_validate`
+
+    :returns: a dictionary with seconds and MBytes per second for each approach
+    """
+    import os
+    import tempfile
+    from random import Random
+    rnd = Random(seed)
+    macs = [MacAddress.mac_expand('{:012x}'.format(rnd.getrandbits(48)), upper=False) for i in range(1000)]
+    data = '\n'.join(['Oct 18 11:48:01 router dhcpd[{:d}]: DHCPACK on 10.0.1.{:d} to {} via eth0'.format(
+        i, i % 255, rnd.choice(macs).upper() if i % 3 else rnd.choice(macs)) for i in range(lines)]).encode('ascii')
+    size_mb = len(data) / float(1024 * 1024)
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            fout.write(data)
+        rt = {'size_mb': size_mb}
+        started = _timer()
+        with open(path) as fin:
+            found = [MacAddress.mac_to_int(token) for line in fin for token in line.split()
+                     if MacAddress.mac_validate(token) is not None]
+        rt['tokens_secs'] = _timer() - started
+        started = _timer()
+        assert list(mac_scan(path)) == found
+        rt['mac_scan_secs'] = _timer() - started
+        started = _timer()
+        assert sum(mac_count(path).values()) == len(found)
+        rt['mac_count_secs'] = _timer() - started
+    finally:
+        os.remove(path)
+    for name in ('tokens', 'mac_scan', 'mac_count'):
+        rt[name + '_mb_per_sec'] = size_mb / rt[name + '_secs']
+    return rt
 
 
 class Progress(object):
@@ -194,3 +762,281 @@ class Progress(object):
             if cnt % 1000 == 0:
                 prg.progress(1000, extra_dict=extra_dict)
 
+
+_ticker_lock = threading.Lock()
+_ticker_progress = weakref.WeakSet()          # ProgressFast instances watched by the ticker thread
+_ticker_thread = None
+
+
+def _ticker_run():
+    """forces a clock read on the next progress() call of any ProgressFast not checked for 2 * check_seconds,
+    so a slowdown after a fast phase (large adaptive step) can't postpone prints indefinitely
+    """
+    global _ticker_thread
+    while True:
+        with _ticker_lock:
+            active = [prg for prg in _ticker_progress if getattr(prg, 'state', 0) != 2]
+            if not active:
+                _ticker_thread = None
+                return
+        now, sleep_seconds = _timer(), min(prg.check_seconds for prg in active)
+        for prg in active:
+            if now - prg._t_last_check > 2 * prg.check_seconds:
+                prg._next_check = 0
+        del active, prg                         # don't keep instances alive while sleeping
+        time.sleep(sleep_seconds)
+
+
+def _ticker_register(prg):
+    global _ticker_thread
+    with _ticker_lock:
+        _ticker_progress.add(prg)
+        if _ticker_thread is None or not _ticker_thread.is_alive():    # not started yet or lost on fork
+            _ticker_thread = threading.Thread(target=_ticker_run, name='ProgressFastTicker')
+            _ticker_thread.daemon = True
+            _ticker_thread.start()
+
+
+class ProgressFast(Progress):
+    """a :class:`Progress` with low per call overhead for tight loops
+    progress() is an int increment and a compare, the clock (perf_counter) is read only every N increments
+    where N adapts to the rate so that it is read about every check_seconds, formatting happens only when printing.
+    A daemon ticker thread shared by all instances resets N when a check is overdue, so if the loop slows down
+    the clock is still read within a few check_seconds.
+    rate and ETA are computed over a sliding window of window_seconds instead of the lifetime average
+
+    :param float window_seconds: seconds of the sliding window for rate and ETA
+    :param float check_seconds: target seconds between clock reads
+
+    :Example:
+        >>> prg = ProgressFast(max_count=10 ** 7, every_seconds=1)
+        >>> for i in range(10 ** 7):
+        >>>     prg.progress()
+    """
+    def __init__(self, max_count=None, head_line="progress", extra_frmt='', extra_dict={}, every_seconds=None,
+                 every_mod=None, window_seconds=60, check_seconds=0.05):
+        self.window_seconds = window_seconds
+        self.check_seconds = check_seconds
+        super(ProgressFast, self).__init__(max_count, head_line, extra_frmt, extra_dict, every_seconds, every_mod)
+        self.t_start = _timer()
+
+    def reset(self, extra_dict={}):
+        super(ProgressFast, self).reset(extra_dict)
+        now = _timer()
+        self.operations = 0
+        self.t_last_print = self._t_last_check = now
+        self._ops_last_check = 0
+        self._step = 1
+        self._next_check = 0
+        self._next_mod = self.every_mod or 0
+        self._samples = deque([(now, 0)])
+        _ticker_register(self)
+
+    def progress(self, inc=1, extra_dict=None):
+        self.operations += inc
+        if self.operations >= self._next_check:
+            self._check(extra_dict)
+
+    def _check(self, extra_dict):
+        now, ops = _timer(), self.operations
+        elapsed, delta = now - self._t_last_check, ops - self._ops_last_check
+        if elapsed > 0 and delta > 0:       # aim for a clock read every check_seconds, at most double each time
+            self._step = max(1, min(self._step * 2, int(delta * self.check_seconds / elapsed)))
+        else:
+            self._step *= 2
+        self._t_last_check, self._ops_last_check = now, ops
+        samples = self._samples
+        samples.append((now, ops))
+        while len(samples) > 2 and samples[1][0] < now - self.window_seconds:
+            samples.popleft()
+        if self.max_count is not None and ops >= self.max_count:
+            self.print_end(extra_dict)
+        elif self.every_mod is not None:
+            if ops >= self._next_mod:
+                self.print_stats(extra_dict)
+                self._next_mod = (ops // self.every_mod + 1) * self.every_mod
+        elif self.state == 0 or now - self.t_last_print > self.every_seconds:
+            self.state = self.state or 1
+            self.print_stats(extra_dict)
+        next_check = ops + self._step
+        if self.every_mod is not None:
+            next_check = min(next_check, self._next_mod)
+        if self.max_count is not None and ops < self.max_count:
+            next_check = min(next_check, self.max_count)
+        self._next_check = next_check
+
+    def rate(self):
+        """:returns: operations per second over the sliding window"""
+        t_old, ops_old = self._samples[0]
+        now = _timer()
+        return (self.operations - ops_old) / (now - t_old) if now > t_old else 0.0
+
+    def print_stats(self, extra_dict=None):
+        now = self.t_last_print = _timer()
+        self.dt_last_print = datetime.now()
+        d = self._dict
+        d.cnt += 1
+        d.operations = self.operations
+        d.date_time = self.dt_last_print.strftime(FMT_DT_GENERIC)
+        if extra_dict is not None:
+            d.update(extra_dict)
+        d.run_time = seconds_to_DHMS(now - self.t_start)
+        rate = self.rate()
+        d.per_sec = int(rate)
+        if self.max_count:
+            d.percent = 100.0 * self.operations / self.max_count
+            d.ETA = seconds_to_DHMS(max(0, self.max_count - self.operations) / rate) if rate > 0 else ''
+        print(self._frmt.format(**d))
+
+
+class ProgressCounter(object):
+    """a worker side counter of :class:`ProgressAggregator` (get one from :meth:`ProgressAggregator.counter`)
+    progress() is a local int increment, the count is written to the shared slot every flush_every increments
+    it can be passed to a multiprocessing Process or a Thread as an argument
+    """
+    def __init__(self, counts, done, slot, flush_every=1000):
+        self._counts, self._done, self.slot = counts, done, slot
+        self.flush_every = flush_every
+        self.count = counts[slot]
+        self._next_flush = self.count + flush_every
+
+    def __repr__(self):
+        return "<{}: slot:{:d} count:{:d}>".format(self.__class__.__name__, self.slot, self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def progress(self, inc=1):
+        self.count += inc
+        if self.count >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """publishes local count to the aggregator"""
+        self._counts[self.slot] = self.count
+        self._next_flush = self.count + self.flush_every
+
+    def close(self):
+        """flushes and marks worker as done"""
+        self.flush()
+        self._done[self.slot] = 1
+
+
+class ProgressAggregator(ProgressFast):
+    """aggregates progress of many worker processes or threads to a single :class:`Progress` table
+    workers count with a :class:`ProgressCounter` which publishes its count to a shared memory slot in batches,
+    a reporter thread in this process polls the slots and prints one table with totals, active workers,
+    min/max worker rates and a global ETA (rates are over a sliding window of window_seconds)
+
+    :param int workers: number of workers (slots)
+    :param int flush_every: worker increments between writes to shared memory
+    :param float poll_seconds: seconds between polls of worker slots
+
+    :Example:
+        >>> def work(counter):
+        >>>     with counter:
+        >>>         for i in range(10 ** 6):
+        >>>             counter.progress()
+        >>> agg = ProgressAggregator(workers=4, max_count=4 * 10 ** 6, every_seconds=5)
+        >>> procs = [multiprocessing.Process(target=work, args=(agg.counter(i),)) for i in range(4)]
+        >>> with agg:               # starts reporter thread, stops it and prints end on exit
+        >>>     [p.start() for p in procs]
+        >>>     [p.join() for p in procs]
+        >>> agg.print_workers()
+    """
+    def __init__(self, workers, max_count=None, head_line="progress", extra_frmt='', extra_dict={}, every_seconds=10,
+                 flush_every=1000, window_seconds=60, poll_seconds=0.5):
+        self.workers = workers
+        self.flush_every = flush_every
+        self._counts = RawArray('Q', workers)           # one slot per worker written only by its owner
+        self._done = RawArray('b', workers)
+        self._worker_samples = deque()
+        self.worker_rates = [0.0] * workers
+        self._stop = threading.Event()
+        self._thread = None
+        extra = {'active': '{:d}/{:d}'.format(workers, workers), 'min_wrk_ps': 0, 'max_wrk_ps': 0}
+        extra.update(extra_dict)
+        super(ProgressAggregator, self).__init__(
+            max_count, head_line, '{active:9}|{min_wrk_ps:12,d}|{max_wrk_ps:12,d}|' + extra_frmt, extra,
+            every_seconds, None, window_seconds)
+        self.poll_seconds = min(poll_seconds, self.every_seconds)     # every_seconds None defaults to 60 in Progress
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def counter(self, slot):
+        """:returns: a :class:`ProgressCounter` for worker slot 0..workers - 1"""
+        return ProgressCounter(self._counts, self._done, slot, self.flush_every)
+
+    def poll(self, extra_dict=None):
+        """reads worker slots, updates totals and rates and prints a row if due"""
+        now, counts = _timer(), self._counts[:]
+        samples = self._worker_samples
+        samples.append((now, counts))
+        while len(samples) > 2 and samples[1][0] < now - self.window_seconds:
+            samples.popleft()
+        t_old, counts_old = samples[0]
+        if now > t_old:
+            self.worker_rates = [(cnt - cnt_old) / (now - t_old) for cnt, cnt_old in zip(counts, counts_old)]
+        extra = {'active': '{:d}/{:d}'.format(self.workers - sum(self._done), self.workers),
+                 'min_wrk_ps': int(min(self.worker_rates)), 'max_wrk_ps': int(max(self.worker_rates))}
+        if extra_dict is not None:
+            extra.update(extra_dict)
+        self.operations = sum(counts)
+        self._check(extra)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.poll()
+
+    def start(self):
+        """starts reporter thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ProgressAggregator')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """stops reporter thread and prints end of table"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.poll()
+        self.print_end()
+
+    def print_workers(self, out=None):
+        """prints a table of per worker counts and rates"""
+        rows = [(slot, cnt, int(rate), bool(done))
+                for slot, (cnt, rate, done) in enumerate(zip(self._counts, self.worker_rates, self._done))]
+        TableRenderer(['worker', 'count', 'per_sec', 'done'], sample_size=None).render(rows, out)
+
+
+def benchmark_progress(count=10 ** 6):
+    """measures overhead per progress() call of :class:`Progress` and :class:`ProgressFast` (output is discarded)
+
+    :returns: a dictionary with nano seconds per call for each class (loop overhead subtracted)
+    """
+    import io
+    from contextlib import redirect_stdout
+    started = _timer()
+    for i in range(count):
+        pass
+    loop_secs = _timer() - started
+    rt = {}
+    with redirect_stdout(io.StringIO()):
+        for cls in (Progress, ProgressFast):
+            prg = cls(max_count=count, every_seconds=1)
+            progress = prg.progress
+            started = _timer()
+            for i in range(count):
+                progress()
+            rt[cls.__name__ + '_nsec_per_call'] = max(0, _timer() - started - loop_secs) * 10 ** 9 / count
+    return rt
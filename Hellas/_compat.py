@@ -0,0 +1,9 @@
+"""optional dependencies and timers shared by the modules with vectorized code paths (Athens, Pella, Thebes),
+kept out of the package ``__init__`` so importing i.e. Sparta doesn't load numpy
+"""
+
+from time import perf_counter as _timer     # high resolution timer for benchmarks
+try:
+    import numpy as np
+except ImportError:
+    np = None                   # vectorized code paths fall back to pure python when numpy is missing
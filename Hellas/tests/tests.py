@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 """Library Tests"""
 import unittest
+import io
+import os
+import pickle
 import random
+import threading
 
-from Hellas import (Olympia, Sparta, Pella)
+from Hellas import (Athens, Olympia, Sparta, Pella, Thebes)
 
 
 class Test(unittest.TestCase):
@@ -24,5 +28,542 @@ class Test(unittest.TestCase):
         vl_decoded = b62.decode(b62.encode(vl))
         self.assertEqual(vl_decoded, vl, "decoded value doesn't match encoded value " + str(vl))
 
+    def test_haversine_many(self):
+        pa = [(random.uniform(-180, 180), random.uniform(-90, 90)) for i in range(50)]
+        pb = [(random.uniform(-180, 180), random.uniform(-90, 90)) for i in range(7)]
+        expected = [Athens.haversine(a[0], a[1], b[0], b[1]) for a in pa for b in pb]
+        many = Athens.haversine_many([a[0] for a in pa for b in pb], [a[1] for a in pa for b in pb],
+                                     [b[0] for a in pa for b in pb], [b[1] for a in pa for b in pb])
+        matrix = [i for row in Athens.distance_matrix(pa, pb, chunk_mb=0.001) for i in row]
+        for e, m, d in zip(expected, many, matrix):
+            self.assertAlmostEqual(e, m, delta=1e-6)
+            self.assertAlmostEqual(e, d, delta=1e-6)
+
+    def test_geo_grid_index(self):
+        all_points = [(i, random.uniform(-180, 180), random.uniform(-90, 90)) for i in range(2000)]
+        all_points += [(i, random.uniform(-180, -179), random.uniform(-1, 1)) for i in range(2000, 2100)]
+        for cell_deg in (5, 7):                     # 7 doesn't divide 360
+            idx = Athens.GeoGridIndex(all_points, cell_deg=cell_deg)
+            for key in range(0, 2100, 10):
+                idx.delete(key)
+            points = [p for p in all_points if p[0] % 10]
+            for lon, lat in [(0, 0), (179.9, 10), (-179.9, -10), (10, 89.5), (-20, -89.9), (179.9, 0), (180, 0.5)]:
+                brute = sorted((Athens.haversine(lon, lat, p[1], p[2]), p[0]) for p in points)
+                for radius in (1e5, 2e5, 1e6, 5e6):
+                    self.assertEqual(sorted(idx.within_radius((lon, lat), radius)), [i for i in brute if i[0] <= radius])
+                self.assertEqual([i[0] for i in idx.nearest((lon, lat), 5)], [i[0] for i in brute[:5]])
+        self.assertEqual(len(Athens.GeoGridIndex([('a', -179.1, 0.0)], cell_deg=7).within_radius((179.9, 0.0), 200000)), 1)
+
+    def test_ngram_counter(self):
+        text = "the quick brown fox jumps over the lazy dog " * 50
+        self.assertEqual(list(Athens.ngrams_stream(io.StringIO(text), 3, chunk_size=7)), list(Athens.ngrams(text, 3)))
+        exact, approx = Athens.NgramCounter(3), Athens.NgramCounter(3, approximate=True, top_k=5, width=4096)
+        exact.update(text)
+        approx.update(iter(text))
+        self.assertEqual(exact.most_common(1), approx.most_common(1))
+        for gram, cnt in exact.most_common():
+            self.assertGreaterEqual(approx[gram], cnt)
+        self.assertEqual(exact.stats()['ngrams'], len(text) - 2)
+
+    def test_bitmap(self):
+        offsets = set(random.sample(range(1000), 100))
+        other = set(random.sample(range(1000), 100))
+        bm, bm_other = Athens.Bitmap.from_iter(1000, offsets), Athens.Bitmap.from_iter(1000, other)
+        self.assertEqual(list(bm), sorted(offsets))
+        self.assertEqual(bm.popcount(), len(offsets))
+        self.assertEqual(list(bm & bm_other), sorted(offsets & other))
+        self.assertEqual(list(bm | bm_other), sorted(offsets | other))
+        self.assertEqual(list(bm ^ bm_other), sorted(offsets ^ other))
+        self.assertEqual(list(bm.andnot(bm_other)), sorted(offsets - other))
+        shared = Athens.Bitmap.from_buffer(bytearray(bm.to_bytes()), 1000)
+        self.assertEqual(shared, bm)
+        shared.clear(min(offsets))
+        self.assertFalse(min(offsets) in shared)
+        self.assertEqual(Athens.bit_len(2 ** 70), 71)
+        padded = Athens.Bitmap.from_bytes(b'\xff', 3)            # bits beyond size are not members
+        self.assertEqual((padded.popcount(), list(padded)), (3, [0, 1, 2]))
+        self.assertEqual(padded, Athens.Bitmap.from_iter(3, [0, 1, 2]))
+        shared = Athens.Bitmap.from_buffer(bytearray(b'\xff\xff'), 3)
+        self.assertEqual((shared.popcount(), list(shared), shared.to_bytes()), (3, [0, 1, 2], b'\x07'))
+        self.assertEqual(shared, padded)
+        self.assertRaises(ValueError, Athens.Bitmap.from_buffer, bytearray(1), 9)
+
+    def test_geohash(self):
+        self.assertEqual(Athens.geohash_encode(-5.6, 42.6, 5), 'ezs42')
+        self.assertEqual(sorted(Athens.geohash_neighbours('ezs42')),
+                         ['ezefp', 'ezefr', 'ezefx', 'ezs40', 'ezs41', 'ezs43', 'ezs48', 'ezs49'])
+        points = [(random.uniform(-180, 180), random.uniform(-90, 90), i) for i in range(500)]
+        hashes = Athens.geohash_encode_many([p[0] for p in points], [p[1] for p in points], 8)
+        self.assertEqual([str(i) for i in hashes], [Athens.geohash_encode(p[0], p[1], 8) for p in points])
+        edges = [(-181, 0), (181, 0), (0, -91), (0, 91), (-180, -90), (180, 90)]
+        self.assertEqual([str(i) for i in Athens.geohash_encode_many([p[0] for p in edges], [p[1] for p in edges], 7)],
+                         [Athens.geohash_encode(p[0], p[1], 7) for p in edges])
+        self.assertEqual(Athens.geohash_encode(-181, 0, 7), '8000000')
+        lons, lats = Athens.geohash_decode_many(hashes)
+        for p, lon, lat in zip(points, lons, lats):
+            self.assertLess(abs(p[0] - lon), 360.0 / 2 ** 20)
+            self.assertLess(abs(p[1] - lat), 180.0 / 2 ** 20)
+        buckets = Athens.geohash_buckets(points, 2, chunk_size=64)
+        self.assertEqual(sum(len(i) for i in buckets.values()), len(points))
+        self.assertIn(points[0], Athens.geohash_candidates(buckets, points[0][:2], 2))
+
+    def test_minhash_lsh(self):
+        words = ["w{:d}".format(random.randrange(10000)) for i in range(400)]
+        docs = [" ".join(words[i * 20:i * 20 + 20]) for i in range(20)]
+        lsh = Athens.LSHIndex(Athens.MinHasher(128, n=5), bands=32)
+        lsh.add_many(enumerate(docs))
+        lsh.add('dup', docs[3] + " w1")
+        exact_a, exact_b = Athens.shingle_hashes(docs[3]), Athens.shingle_hashes(docs[3] + " w1")
+        exact = len(exact_a & exact_b) / float(len(exact_a | exact_b))
+        self.assertIn(3, lsh.query(docs[3]))
+        pairs = [i for i in lsh.candidate_pairs(0.5)]
+        self.assertIn((3, 'dup'), [i[:2] for i in pairs])
+        self.assertAlmostEqual(lsh.jaccard(3, 'dup'), exact, delta=0.15)
+
+    def test_track(self):
+        points = [(179.9 + i * 0.001 + random.uniform(-1e-4, 1e-4), 10 + random.uniform(-1e-4, 1e-4), i * 2) for i in range(300)]
+        points = [((p[0] + 180) % 360 - 180, p[1], p[2]) for p in points]
+        expected = [0.0] + [Athens.distance_points(a, b) for a, b in zip(points, points[1:])]
+        chunks = list(Athens.track_segments_stream(iter(points), chunk_size=64))
+        distances = [d for chunk in chunks for d in chunk[0]]
+        speeds = [s for chunk in chunks for s in chunk[2]]
+        for e, d, s in zip(expected, distances, speeds):
+            self.assertAlmostEqual(e, d, delta=1e-6)
+            self.assertAlmostEqual(e / 2, s, delta=1e-6)
+        self.assertAlmostEqual(Athens.track_length(points), sum(expected), delta=1e-3)
+        simplified = Athens.douglas_peucker(points, 50)
+        self.assertEqual((simplified[0], simplified[-1]), (points[0], points[-1]))
+        self.assertLess(len(simplified), 10)
+        self.assertEqual(Athens.douglas_peucker(points, 0), points)
+
+    def test_dms2dd_many(self):
+        rows = [(random.randint(0, 89), random.randint(0, 59), random.randint(0, 59), random.choice('NSEW')) for i in range(200)]
+        expected = [Athens.dms2dd(*i) for i in rows]
+        uniform = [u'{:d}°{:d}\'{:d}"{}'.format(*i) for i in rows]
+        mixed = uniform[:100] + ['{:d} {:d} {:d} {}'.format(*i) for i in rows[100:]] + ['foo', '12 61 00 N']
+        for strings in (uniform, mixed):
+            values, errors = Athens.dms2dd_many(strings)
+            for e, v in zip(expected, values):
+                self.assertAlmostEqual(e, v, delta=1e-9)
+        self.assertEqual([i[0] for i in errors], [200, 201])
+        csv_file = io.StringIO(u"name,lat\na,37°58'46\"N\nb,bad\n")
+        values, errors = Athens.dms2dd_column(csv_file, 1)
+        self.assertAlmostEqual(values[0], 37.979444, delta=1e-6)
+        self.assertEqual(errors, [(1, 'bad', "can't parse DMS")])
+
+    def test_pickle_codecs(self):
+        obj = {'a': list(range(100)), 'b': b'x' * 1000}
+        legacy = Olympia.pickle_compress(obj)
+        self.assertEqual(Olympia.pickle_decompress(legacy), obj)
+        for codec in Olympia.CODECS:
+            self.assertEqual(Olympia.pickle_decompress(Olympia.pickle_compress(obj, codec=codec, protocol=2)), obj)
+        self.assertRaises(Olympia.ErrorUnknownCodec, Olympia.pickle_compress, obj, codec='foo')
+        report = Olympia.benchmark_codecs(obj, codecs=['zlib-1', 'raw'], repeat=1)
+        self.assertEqual(sorted(i['codec'] for i in report), ['raw', 'zlib-1'])
+
+    def test_pickle_frames(self):
+        records = [{'id': i, 'payload': 'x' * random.randrange(100)} for i in range(3000)]
+        stream = io.BytesIO()
+        with Olympia.PickleFrameWriter(stream, chunk_size=4096, codec='zlib-1') as writer:
+            record = {}
+            for i in records:
+                record.update(i)              # same mutated object written each time
+                writer.write(record)
+        reader = Olympia.PickleFrameReader(io.BytesIO(stream.getvalue()))
+        self.assertGreater(reader.frames_count, 1)
+        self.assertEqual(list(reader), records)
+        self.assertEqual(list(reader.iter_from(2500)), records[2500:])
+        self.assertEqual(reader[1234], records[1234])
+        stream = io.BytesIO()
+        writer = Olympia.PickleFrameWriter(stream, chunk_size=4096)
+        writer.write_many(records)
+        writer.flush()                                              # not closed, no index footer
+        self.assertEqual(list(Olympia.PickleFrameReader(io.BytesIO(stream.getvalue()))), records)
+
+    def test_object_store(self):
+        import shutil
+        import tempfile
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, 'store')
+        try:
+            with Olympia.ObjectStore(path) as store:
+                store.put_many(('k{:d}'.format(i), {'id': i}) for i in range(500))
+                store[b'bytes_key'] = [1, 2]
+                store['k1'] = 'overwritten'
+                del store['k2']
+            reader = Olympia.ObjectStore(path, readonly=True, cache_size=10)
+            self.assertEqual(reader.get_many(['k0', 'k1', b'bytes_key']), [{'id': 0}, 'overwritten', [1, 2]])
+            self.assertNotIn('k2', reader)
+            writer = Olympia.ObjectStore(path)
+            writer['new'] = 'value'
+            reader.refresh()
+            self.assertEqual(reader['new'], 'value')
+            size = os.path.getsize(path + '.data')
+            writer.compact()
+            self.assertLess(os.path.getsize(path + '.data'), size)
+            self.assertEqual(len(writer), 501)
+            self.assertEqual(writer['k499'], {'id': 499})
+            writer['after'] = 'compaction'
+            reader.refresh()
+            self.assertEqual(reader['after'], 'compaction')
+            self.assertEqual(reader.get_many(['k1', 'new']), ['overwritten', 'value'])
+            self.assertEqual(len(reader), 502)
+            writer.close()
+            reader.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_zdict(self):
+        samples = [{'id': i, 'email': 'user{:d}@example.com'.format(i), 'active': bool(i % 2)} for i in range(300)]
+        zdict = Olympia.ZDict.train(samples[:100], size=4096)
+        restored = Olympia.ZDict.from_bytes(zdict.to_bytes())
+        for obj in samples[100:]:
+            self.assertEqual(restored.decompress(zdict.compress(obj)), obj)
+        other = Olympia.ZDict(b'another dictionary')
+        self.assertRaises(Olympia.ErrorUnknownCodec, other.decompress, zdict.compress(samples[0]))
+        default_level = Olympia.ZDict.from_bytes(Olympia.ZDict(zdict.data, level=-1).to_bytes())
+        self.assertEqual(default_level.level, -1)
+        self.assertEqual(default_level.decompress(default_level.compress(samples[0])), samples[0])
+        self.assertRaises(ValueError, Olympia.ZDict, b'data', level=10)
+        self.assertEqual(Olympia.pickle_decompress(Olympia.pickle_compress(samples[0], codec=zdict.register())), samples[0])
+        report = Olympia.benchmark_zdict(samples[100:], zdict)
+        self.assertLess(report['zdict_size'], report['plain_size'])
+
+    def test_pickle_compress_many(self):
+        objs = [{'id': i, 'payload': 'x' * random.randrange(200)} for i in range(1000)]
+        blobs = Olympia.pickle_compress_many(objs, codec='zlib-1', batch_size=7, workers=3)
+        self.assertEqual([Olympia.pickle_decompress(i) for i in blobs], objs)
+        self.assertEqual(Olympia.pickle_decompress_many(blobs, batch_size=50, workers=2), objs)
+        self.assertEqual(Olympia.pickle_decompress_many(blobs, batch_size=500, workers=2, executor='process'), objs)
+
+    @unittest.skipIf(Olympia.shared_memory is None, "requires python 3.8+")
+    def test_shared_object(self):
+        obj = {'blob': bytearray(os.urandom(100000)), 'meta': {'name': 'foo'}}
+        with Olympia.SharedObject.publish(obj) as producer:
+            consumer = Olympia.SharedObject.attach(producer.descriptor)
+            loaded = consumer.load()
+            self.assertEqual(loaded, obj)
+            del loaded
+            consumer.close()
+        self.assertRaises((IOError, OSError), Olympia.SharedObject.attach, producer.descriptor)
+        raw = bytearray(os.urandom(1000))
+        producer = Olympia.SharedObject.publish({'raw': pickle.PickleBuffer(raw)})
+        consumer = Olympia.SharedObject.attach(producer.descriptor)
+        loaded = consumer.load()
+        self.assertIsInstance(loaded['raw'], memoryview)           # mapped, not copied
+        self.assertEqual(bytes(loaded['raw']), bytes(raw))
+        loaded['raw'].release()
+        del loaded
+        consumer.close()
+        producer.close()
+        producer.unlink()                                           # unlinks through its own handle after close
+        shm, Olympia.shared_memory = Olympia.shared_memory, None   # as on python < 3.8
+        try:
+            self.assertRaises(Sparta.Error, Olympia.SharedObject.publish, b'x')
+            self.assertRaises(Sparta.Error, Olympia.SharedObject.attach, producer.descriptor)
+            self.assertRaises(Sparta.Error, Olympia.benchmark_shared_object, (1,))
+        finally:
+            Olympia.shared_memory = shm
+        self.assertRaises((IOError, OSError), Olympia.SharedObject.attach, producer.descriptor)
+
+    def test_file_to_base64_iter(self):
+        import base64
+        import tempfile
+        data = os.urandom(100001)
+        expected = base64.b64encode(data)
+        with tempfile.NamedTemporaryFile() as ftmp:
+            ftmp.write(data)
+            ftmp.flush()
+            self.assertEqual(b''.join(Pella.file_to_base64_iter(ftmp.name, chunk_size=1000)), expected)
+            self.assertEqual(Pella.file_to_base64(ftmp.name), expected)
+            self.assertRaises(Pella.ErrorFileTooBig, Pella.file_to_base64_iter, ftmp.name, max_mb=0.05)
+        self.assertEqual(b''.join(Pella.file_to_base64_iter(io.BytesIO(data), chunk_size=1000)), expected)
+
+        class ShortReads(object):                   # a pipe like object, no size known, short reads
+            def __init__(self, data):
+                self.fin = io.BytesIO(data)
+
+            def read(self, size):
+                return self.fin.read(random.randint(1, size))
+        sink = io.BytesIO()
+        self.assertEqual(Pella.file_to_base64_stream(ShortReads(data), sink, chunk_size=100), len(expected))
+        self.assertEqual(sink.getvalue(), expected)
+        with self.assertRaises(Pella.ErrorFileTooBig):
+            list(Pella.file_to_base64_iter(ShortReads(data), max_mb=0.05))
+        with tempfile.NamedTemporaryFile() as ftmp:
+            self.assertEqual(b''.join(Pella.file_to_base64_iter(ftmp.name)), b'')
+        if os.path.exists('/proc/self/status'):     # reports size 0 but has contents
+            decoded = base64.b64decode(b''.join(Pella.file_to_base64_iter('/proc/self/status', chunk_size=300)))
+            self.assertTrue(decoded.startswith(b'Name:'))
+
+    def test_base62(self):
+        b62 = Pella.Base62
+        rnd = random.Random(1)
+        numbers = [0, 1, 61, 62, 3843, 3844, 2 ** 64 - 1] + [rnd.getrandbits(rnd.choice((32, 64, 128))) for i in range(500)]
+        for number in numbers:
+            code = b62.encode(number)
+            self.assertEqual(code, b62._code(number, b62.numeric_symbols, b62.symbols))
+            self.assertEqual(b62.decode(code), number)
+        self.assertEqual(b62.decode_many(b62.encode_many(numbers)), numbers)
+        fixed = b62.encode_many(numbers, b62.width_128)
+        self.assertEqual(sorted(fixed), [b62.encode(i, b62.width_128) for i in sorted(numbers)])
+        self.assertEqual(b62.decode_many(fixed[:7], 'Q').tolist(), numbers[:7])
+        self.assertRaises(ValueError, b62.encode, -1)
+        self.assertRaises(ValueError, b62.encode, 62, 1)
+        self.assertRaises(ValueError, b62.decode, '12-')
+        if Pella.np is not None:
+            arr = Pella.np.array(numbers[:7] + [i >> 64 for i in numbers[7:]], dtype=Pella.np.uint64)
+            self.assertEqual(b62.encode_many(arr), b62.encode_many(arr.tolist()))
+            self.assertEqual(b62.encode_many(arr, b62.width_64), b62.encode_many(arr.tolist(), b62.width_64))
+
+    def test_base62_bytes(self):
+        import hashlib
+        b62 = Pella.Base62
+        datas = [b'', b'\x00', b'\x00\x00\xff', b'\xff' * 16] + [hashlib.sha1(str(i).encode()).digest() for i in range(300)]
+        datas += [b'\x00' * 4 + data for data in datas[4:20]]
+        for data in datas:
+            code = b62.encode_bytes(data)
+            self.assertEqual(len(code), b62.bytes_width(len(data)))
+            self.assertEqual(b62.decode_bytes(code), data)
+        codes = b62.encode_bytes_many(datas)
+        self.assertEqual(b62.decode_bytes_many(codes), datas)
+        self.assertEqual(b62.encode_bytes_many(datas[4:10], 30), [b62.encode_bytes(i, 30) for i in datas[4:10]])
+        self.assertEqual(b62.decode_bytes_many(b62.encode_bytes_many(datas[4:10], 30), 20), datas[4:10])
+        self.assertEqual(b62.bytes_width(16), 22)
+        self.assertRaises(ValueError, b62.decode_bytes, 'zz', 1)
+        self.assertRaisesRegex(ValueError, 'in 1 bytes', b62.decode_bytes, 'zz')
+
+    def test_id_generator(self):
+        idg = Pella.IdGenerator(node=5)
+        ids = [idg.next_id() for i in range(20000)]
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertEqual(Pella.IdGenerator.split(ids[0])[1], 5)
+        self.assertEqual(idg.expanded(), Pella.obj_id_expanded())
+        codes = [idg.next_b62() for i in range(100)]
+        self.assertEqual(codes, sorted(codes))
+        results = []
+
+        def worker():
+            results.extend([idg.next_id() for i in range(5000)])
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        self.assertEqual(len(set(results)), 20000)
+
+    def test_shuffle_sample(self):
+        lst = list(range(1000))
+        shuffled = Pella.list_shuffle(list(lst), 7)
+        self.assertEqual(shuffled, Pella.list_shuffle(list(lst), random.Random(7)))
+        self.assertNotEqual(shuffled, lst)
+        self.assertEqual(sorted(shuffled), lst)
+        smpl = Pella.sample(iter(lst), 10, 3)
+        self.assertEqual(smpl, Pella.sample(lst, 10, 3))
+        self.assertEqual(len(set(smpl)), 10)
+        self.assertTrue(set(smpl) <= set(lst))
+        self.assertEqual(Pella.sample(range(5), 10), list(range(5)))
+        smpl = Pella.sample_weighted(lst, 20, weight=lambda x: x % 2, rnd=3)
+        self.assertEqual(smpl, Pella.sample_weighted(lst, 20, weight=lambda x: x % 2, rnd=3))
+        self.assertEqual(len(set(smpl)), 20)
+        self.assertTrue(all(i % 2 for i in smpl))
+        self.assertEqual(Pella.sample_weighted([('a', 1), ('b', 0)], 2), ['a'])
+
+    def test_dict_projector(self):
+        rnd = random.Random(0)
+        records = [dict((rnd.choice('abcdefgh'), rnd.choice((None, 0, 1, 'x', [1], {'a': 1}))) for j in range(6)) for i in range(300)]
+        cases = [(['a', 'c', [1]], [None, 'x']), (['b'], [None, [1]]), ([], []), (['a'], [])]
+        for keys, values in cases:
+            projector = Pella.DictProjector(exclude_keys=keys, exclude_values=values)
+            expected = [Pella.dict_copy(record, keys, values) for record in records]
+            self.assertEqual([projector(record) for record in records], expected)
+            self.assertEqual(list(projector.project_many(records)), expected)
+            projector = Pella.DictProjector(include_keys=keys)
+            self.assertEqual(list(projector.project_many(iter(records))), [Pella.dict_clip(record, keys) for record in records])
+
+    def test_table_renderer(self):
+        rows = [['foo', 1, None], ['barbar', 1000, 2.5]]
+        out = io.StringIO()
+        table = Thebes.TableRenderer(['name', 'count', 'x'], autonumber=True, sample_size=1, buffer_rows=2)
+        self.assertEqual(table.render(iter(rows), out), 2)
+        self.assertEqual(out.getvalue().splitlines(), [             # total unknown, counter sized for 9,999,999
+            '-------------------------', '|#      |name|count|x   |', '-------------------------',
+            '|1      |foo |1    |None|', '|2      |barbar|1000 |2.5 |', '-------------------------'])
+        out = io.StringIO()
+        Thebes.TableRenderer(['name'], autonumber=True, sample_size=5).render(iter([['foo']] * 12), out)
+        self.assertEqual(set(map(len, out.getvalue().splitlines())), {14})
+        out = io.StringIO()
+        Thebes.TableRenderer(['name'], autonumber=True).render(iter([['foo']] * 12), out)
+        self.assertEqual(out.getvalue().splitlines()[1], '|# |name|')          # iterator exhausted by sample
+        out = io.StringIO()
+        Thebes.TableRenderer(widths=[6, 4, 3], lines=False).render(rows, out)
+        self.assertEqual(out.getvalue(), '|foo   |1   |None|\n|barbar|1000|2.5|\n')
+        self.assertEqual(rows, [['foo', 1, None], ['barbar', 1000, 2.5]])
+
+    def test_progress_fast(self):
+        from contextlib import redirect_stdout
+        out = io.StringIO()
+        with redirect_stdout(out):
+            prg = Thebes.ProgressFast(max_count=100000, every_mod=25000, head_line=None)
+            for i in range(100000):
+                prg.progress()
+        rows = [line for line in out.getvalue().splitlines() if line.startswith('|') and 'cnt' not in line]
+        self.assertEqual([int(row.split('|')[3].replace(',', '')) for row in rows], [25000, 50000, 75000, 100000])
+        self.assertTrue(rows[-1].endswith('100.00|'))
+        self.assertEqual(prg.state, 2)
+
+    def test_progress_aggregator(self):
+        import multiprocessing
+        from contextlib import redirect_stdout
+
+        def work(counter):
+            with counter:
+                for i in range(10001):
+                    counter.progress()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            agg = Thebes.ProgressAggregator(workers=3, max_count=30003, every_seconds=0.01, head_line=None)
+            procs = [multiprocessing.Process(target=work, args=(agg.counter(0),))]
+            procs += [threading.Thread(target=work, args=(agg.counter(slot),)) for slot in (1, 2)]
+            with agg:
+                [proc.start() for proc in procs]
+                [proc.join() for proc in procs]
+            agg.print_workers()
+        self.assertEqual(agg.operations, 30003)
+        self.assertEqual(list(agg._done), [1, 1, 1])
+        self.assertIn('|  100.00|0/3      |', out.getvalue())
+        agg = Thebes.ProgressAggregator(workers=1, every_seconds=None, poll_seconds=0.5)
+        self.assertEqual((agg.every_seconds, agg.poll_seconds), (60, 0.5))
+
+    def test_mac_address_array(self):
+        rnd = random.Random(0)
+        ints = [rnd.getrandbits(48) for i in range(500)] + [0, 1]
+        strs = [Thebes.MacAddress.mac_expand('{:012x}'.format(i), upper=False) for i in ints]
+        for use_numpy in (False, True):
+            macs = Thebes.MacAddressArray.from_strings(strs, use_numpy=use_numpy)
+            self.assertEqual(macs.ints(), ints)
+            self.assertEqual(macs.to_strings(), strs)
+            self.assertEqual(Thebes.MacAddressArray.from_strings([i.upper().replace(':', '-') for i in strs]).ints(), ints)
+            self.assertEqual(Thebes.MacAddressArray.from_file(io.BytesIO('\n'.join(strs).encode()), use_numpy=use_numpy).ints(), ints)
+            for block_lines in (1, 7, 1000):
+                text = io.StringIO('\n'.join(strs) + '\n\n')
+                self.assertEqual(Thebes.MacAddressArray.from_file(text, use_numpy=use_numpy, block_lines=block_lines).ints(), ints)
+            self.assertEqual(Thebes.MacAddressArray.from_file(io.BytesIO(b''), use_numpy=use_numpy).ints(), [])
+            short = ['a:b:c:d:e:ff', '0a-0b-0c-0d-0e-ff', '0A0B0C0D0EFF']
+            self.assertEqual(Thebes.MacAddressArray.from_strings(short, use_numpy=use_numpy).ints(), [0x0a0b0c0d0eff] * 3)
+            self.assertEqual(str(macs[0]), strs[0])
+            self.assertEqual(macs[-1], Thebes.MacAddress('00:00:00:00:00:01'))
+            self.assertIn(strs[10].upper(), macs)
+            doubled = Thebes.MacAddressArray(ints + ints[:100], use_numpy)
+            self.assertEqual(doubled.unique().ints(), sorted(set(ints)))
+            self.assertEqual(list(doubled.isin(ints[:50])), [i in ints[:50] for i in ints + ints[:100]])
+            self.assertEqual((macs & ints[:10]).ints(), sorted(ints[:10]))
+            self.assertEqual((macs - ints[10:]).ints(), sorted(ints[:10]))
+            self.assertEqual((macs[:5] | macs[5:]).ints(), sorted(ints))
+            self.assertRaises(ValueError, Thebes.MacAddressArray.from_strings, strs + ['zz:00:00:00:00:00'], use_numpy=use_numpy)
+            self.assertEqual(len(Thebes.MacAddressArray.from_strings(['0:1:2:3:4:5', 'foo'], 'skip', use_numpy)), 1)
+
+    def test_mac_scan(self):
+        rnd = random.Random(0)
+        macs = ['{:012x}'.format(rnd.getrandbits(48)) for i in range(50)]
+        parts, expected = [], []
+        for i in range(2000):
+            mac = rnd.choice(macs)
+            text = rnd.choice((':', '-')).join(mac[j:j + 2] for j in range(0, 12, 2))
+            text = text.upper() if i % 2 else text
+            kind = rnd.choice(('ok', 'ok', 'longer', 'prefixed', 'glued'))
+            if kind == 'ok':
+                expected.append(int(mac, 16))
+            elif kind == 'longer':
+                text += ':00'
+            elif kind == 'prefixed':
+                text = '00:' + text
+            else:
+                text = 'f' + text
+            parts.append(rnd.choice(('mac:', ' ', '\n', 'to=', ', ')) + text)
+        data = (''.join(parts) + '\n').encode('ascii')
+        for chunk_size in (7, 100, 4096):
+            self.assertEqual(list(Thebes.mac_scan(io.BytesIO(data), chunk_size=chunk_size)), expected)
+        packed = list(Thebes.mac_scan(io.BytesIO(data), packed=True, chunk_size=1000))
+        self.assertEqual([i for arr in packed for i in arr], expected)
+        import tempfile
+        with tempfile.NamedTemporaryFile() as ftmp:
+            ftmp.write(data)
+            ftmp.flush()
+            self.assertEqual(list(Thebes.mac_scan(ftmp.name, chunk_size=500)), expected)
+        if hasattr(os, 'mkfifo'):                   # not mappable, read in chunks
+            import tempfile
+            fifo = os.path.join(tempfile.mkdtemp(), 'macs')
+            os.mkfifo(fifo)
+
+            def writer():
+                with open(fifo, 'wb') as fout:
+                    fout.write(data)
+            thread = threading.Thread(target=writer)
+            thread.start()
+            self.assertEqual(list(Thebes.mac_scan(fifo, chunk_size=500)), expected)
+            thread.join()
+            os.remove(fifo)
+            os.rmdir(os.path.dirname(fifo))
+        if os.path.exists('/proc/self/net/arp'):    # reports size 0 but has contents
+            with open('/proc/self/net/arp', 'rb') as fin:
+                arp = fin.read()
+            self.assertEqual(list(Thebes.mac_scan('/proc/self/net/arp')), list(Thebes.mac_scan(io.BytesIO(arp))))
+        counts = Thebes.mac_count(io.BytesIO(data), chunk_size=333)
+        self.assertEqual(sum(counts.values()), len(expected))
+        self.assertEqual(counts[expected[0]], expected.count(expected[0]))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "requires fork")
+    def test_id_generator_fork(self):
+        for node in (None, 7):
+            idg = Pella.IdGenerator(node=node)
+            idg.next_id()
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    try:
+                        ids = [idg.next_id() for i in range(2000)]
+                    except Pella.ErrorIdNode:
+                        idg.set_node(8)
+                        ids = [-1] + [idg.next_id() for i in range(2000)]
+                    os.write(write_fd, repr(ids).encode())
+                finally:
+                    os._exit(0)
+            os.close(write_fd)
+            with os.fdopen(read_fd) as fin:
+                child_ids = eval(fin.read())
+            os.waitpid(pid, 0)
+            self.assertEqual(child_ids[0] == -1, node is not None)
+            child_ids = [i for i in child_ids if i != -1]
+            parent_ids = [idg.next_id() for i in range(2000)]
+            self.assertEqual(len(set(parent_ids + child_ids)), 4000)
+
+    def test_minhash_short_docs(self):
+        lsh = Athens.LSHIndex(bands=32)
+        lsh.add('s1', 'hi')
+        lsh.add('s2', 'yo')
+        lsh.add('s3', 'hi')
+        lsh.add('e1', '')
+        lsh.add('e2', '')
+        self.assertEqual(len(Athens.shingle_hashes('hi')), 1)
+        self.assertEqual(Athens.shingle_hashes(''), set())
+        self.assertEqual(list(lsh.candidate_pairs()), [('s1', 's3', 1.0)])
+        self.assertEqual(lsh.jaccard('e1', 'e2'), 0.0)
+        self.assertEqual(lsh.query(''), set())
+
+    def test_progress_fast_slowdown(self):
+        import time
+        from contextlib import redirect_stdout
+        out = io.StringIO()
+        with redirect_stdout(out):
+            prg = Thebes.ProgressFast(every_seconds=0.05, check_seconds=0.01, head_line=None)
+            for i in range(10 ** 6):                # fast burst grows the adaptive step
+                prg.progress()
+            step, printed = prg._step, out.getvalue().count('\n')
+            for i in range(20):                     # slow phase, far fewer calls than step
+                time.sleep(0.02)
+                prg.progress()
+        self.assertGreater(step, 20)
+        self.assertGreaterEqual(out.getvalue().count('\n') - printed, 2)
+
 if __name__ == "__main__":
     unittest.main()